@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -7,6 +8,123 @@ class Settings(BaseSettings):
     MINIO_ROOT_USER: str = Field(..., description="MinIO root user access key")
     MINIO_ROOT_PASSWORD: str = Field(..., description="MinIO root user secret key")
     MINIO_BUCKET: str = Field(..., description="MinIO bucket name for storing files")
+    MINIO_PUBLIC_ENDPOINT: Optional[str] = Field(
+        default=None,
+        description="MinIO endpoint reachable by clients, used in presigned URLs; defaults to MINIO_ENDPOINT"
+    )
+    MINIO_PUBLIC_SECURE: bool = Field(default=False, description="Whether presigned URLs use HTTPS")
+    MINIO_REGION: str = Field(default="us-east-1", description="MinIO region used to sign presigned URLs")
+    PRESIGNED_URL_EXPIRY_SECONDS: int = Field(default=3600, description="Lifetime of presigned upload URLs in seconds")
+    PRESIGNED_DOWNLOAD_EXPIRY_SECONDS: int = Field(
+        default=300,
+        description="Lifetime of the presigned URLs download redirects point to, in seconds"
+    )
+    MINIO_PART_SIZE: int = Field(
+        default=10 * 1024 * 1024,
+        description="Multipart part size in bytes used when streaming uploads to MinIO (minimum 5 MiB)"
+    )
+    UPLOAD_CHUNK_SIZE: int = Field(
+        default=16 * 1024 * 1024,
+        description="Default chunk size in bytes for resumable upload sessions"
+    )
+    UPLOAD_MAX_CHUNK_SIZE: int = Field(
+        default=64 * 1024 * 1024,
+        description="Largest chunk size in bytes a client may request for an upload session"
+    )
+    UPLOAD_SESSION_TTL_SECONDS: int = Field(
+        default=24 * 60 * 60,
+        description="Lifetime of an upload session in seconds; unfinished sessions are aborted afterwards"
+    )
+    UPLOAD_SESSION_SWEEP_SECONDS: int = Field(
+        default=60 * 60,
+        description="Seconds between two sweeps removing expired upload sessions and their partial uploads"
+    )
+    UPLOAD_CONCURRENCY: int = Field(
+        default=8,
+        description="Number of objects uploaded to MinIO in parallel by batch and ZIP uploads"
+    )
+    ZIP_MAX_ENTRIES: int = Field(default=50000, description="Maximum number of entries accepted in an uploaded ZIP archive")
+    ZIP_MAX_TOTAL_SIZE: int = Field(
+        default=20 * 1024 * 1024 * 1024,
+        description="Maximum total uncompressed size in bytes of an uploaded ZIP archive"
+    )
+    ZIP_MAX_COMPRESSION_RATIO: int = Field(
+        default=100,
+        description="Maximum uncompressed/compressed size ratio allowed for a ZIP entry"
+    )
+    INGEST_WORKERS: int = Field(default=2, description="Number of background workers ingesting queued ZIP archives")
+    INGEST_MAX_ATTEMPTS: int = Field(
+        default=3,
+        description="Times an ingestion job is restarted after a worker crash before it is marked failed"
+    )
+    INGEST_STALE_SECONDS: int = Field(
+        default=300,
+        description="Seconds without progress after which a running ingestion job is considered abandoned"
+    )
+    INGEST_HEARTBEAT_SECONDS: int = Field(
+        default=30,
+        description="Seconds between two liveness writes of a running ingestion job; keep well below INGEST_STALE_SECONDS"
+    )
+    INGEST_REAP_INTERVAL_SECONDS: int = Field(
+        default=60,
+        description="Seconds between two sweeps for abandoned or unclaimed ingestion jobs"
+    )
+    BLOB_ORPHAN_GRACE_SECONDS: int = Field(
+        default=24 * 60 * 60,
+        description="Age in seconds after which a blob object without a database row is removed as orphaned"
+    )
+    BLOB_ORPHAN_SWEEP_SECONDS: int = Field(
+        default=6 * 60 * 60,
+        description="Seconds between two sweeps removing orphaned blob objects from MinIO"
+    )
+    ARCHIVE_PREFETCH_DEPTH: int = Field(
+        default=8,
+        description="Number of objects fetched ahead from MinIO while a folder archive is being written"
+    )
+    ARCHIVE_PREFETCH_BYTES: int = Field(
+        default=64 * 1024 * 1024,
+        description="Memory budget in bytes per archive for objects buffered ahead of the writer"
+    )
+    ARCHIVE_DEFLATE_LEVEL: int = Field(
+        default=6,
+        description="Deflate level (1-9) for compressible entries in folder archives"
+    )
+    ARCHIVE_COMPRESSION_THREADS: int = Field(
+        default=0,
+        description="Threads compressing tar.zst / tar.gz folder exports; 0 uses one per CPU core"
+    )
+    ARCHIVE_ZSTD_LEVEL: int = Field(
+        default=3,
+        description="Zstandard level (1-22) for tar.zst folder exports"
+    )
+    ARCHIVE_GZIP_LEVEL: int = Field(
+        default=6,
+        description="Gzip level (1-9) for tar.gz folder exports"
+    )
+    ARCHIVE_GZIP_BLOCK_SIZE: int = Field(
+        default=1024 * 1024,
+        description="Bytes of tar data compressed per gzip member by each thread"
+    )
+    OBJECT_CACHE_MEMORY_BYTES: int = Field(
+        default=256 * 1024 * 1024,
+        description="Memory budget in bytes of the in-process object cache; 0 disables the tier"
+    )
+    OBJECT_CACHE_MEMORY_MAX_OBJECT: int = Field(
+        default=1024 * 1024,
+        description="Largest object in bytes kept in the memory tier of the object cache"
+    )
+    OBJECT_CACHE_DISK_BYTES: int = Field(
+        default=4 * 1024 * 1024 * 1024,
+        description="Disk budget in bytes of the local object cache; 0 disables the tier"
+    )
+    OBJECT_CACHE_DISK_MAX_OBJECT: int = Field(
+        default=256 * 1024 * 1024,
+        description="Largest object in bytes kept in the disk tier of the object cache"
+    )
+    OBJECT_CACHE_DIR: Optional[str] = Field(
+        default=None,
+        description="Directory for the disk tier of the object cache; defaults to the system temp directory"
+    )
 
     POSTGRES_URL: str = Field(..., description="PostgreSQL database URL connection string")
 
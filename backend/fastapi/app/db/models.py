@@ -1,8 +1,11 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, String, Integer, BigInteger, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base  
 
+# Content-addressed objects are stored in MinIO under this prefix plus their SHA-256
+BLOB_PREFIX = "blobs/"
+
 class User(Base):
     __tablename__ = "users"
 
@@ -22,30 +25,120 @@ class File(Base):
     id = Column(String, primary_key=True, index=True)
     filename = Column(String)
     mime_type = Column(String)    
-    size = Column(Integer)
+    size = Column(BigInteger)
     owner_id = Column(Integer, ForeignKey("users.id"))
     upload_time = Column(DateTime, default=datetime.utcnow)
     date_modified = Column(DateTime, nullable=True)
 
-    folder_id = Column(Integer, ForeignKey("folders.id"), nullable=True)
+    folder_id = Column(Integer, ForeignKey("folders.id"), nullable=True, index=True)
+    blob_sha256 = Column(String(64), ForeignKey("blobs.sha256"), nullable=True, index=True)
+    # Strong validator of the content: the SHA-256 for deduplicated files, the
+    # MinIO etag otherwise. NULL for rows written before it was recorded.
+    etag = Column(String(128), nullable=True)
 
     user = relationship("User", back_populates="files")
     folder = relationship("Folder", back_populates="files")
 
+    @property
+    def object_name(self) -> str:
+        """
+        Name of the MinIO object holding this file's content. Files uploaded
+        before deduplication (and chunked session uploads) are stored under their own ID.
+        """
+        if self.blob_sha256:
+            return BLOB_PREFIX + self.blob_sha256
+        return self.id
+
+
+class Blob(Base):
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    @property
+    def object_name(self) -> str:
+        return BLOB_PREFIX + self.sha256
+
 
 class Folder(Base):
     __tablename__ = "folders"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     parent_id = Column(Integer, ForeignKey("folders.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     date_modified = Column(DateTime, nullable=True)
 
+    # Denormalized counters, maintained by the write paths through
+    # `folders_utils.adjust_folder_counters` and repairable from the tables
+    file_count = Column(Integer, nullable=False, default=0, server_default="0")
+    subfolder_count = Column(Integer, nullable=False, default=0, server_default="0")
+    total_file_count = Column(Integer, nullable=False, default=0, server_default="0")
+    total_size = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+    # Materialized path: the IDs from the top-level ancestor down to the
+    # folder itself, each followed by "/" (e.g. "1/5/9/"). Descendants are
+    # the rows whose path starts with this one; see `folders_utils.set_folder_path`
+    path = Column(String, nullable=False, default="", server_default="")
+
+    __table_args__ = (
+        Index("ix_folders_path", "path", postgresql_ops={"path": "text_pattern_ops"}),
+    )
+
     owner = relationship("User", backref="folders")
     parent = relationship("Folder", remote_side=[id], backref="subfolders")
     files = relationship("File", back_populates="folder")
+
+    @property
+    def item_count(self) -> int:
+        """
+        Number of direct files and subfolders.
+        """
+        return (self.file_count or 0) + (self.subfolder_count or 0)
+    
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    id = Column(String, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    folder_id = Column(Integer, ForeignKey("folders.id", ondelete="CASCADE"), nullable=True)
+    filename = Column(String, nullable=False)
+    mime_type = Column(String)
+    size = Column(BigInteger, nullable=False)
+    # NULL for sessions uploaded with a single presigned PUT
+    chunk_size = Column(Integer, nullable=True)
+    object_name = Column(String, nullable=False)
+    # Multipart upload ID; NULL for sessions uploaded with a single presigned PUT
+    upload_id = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Past this time the session is refused and swept by `jobs.upload_sessions`
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+
+    id = Column(String, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    parent_folder_id = Column(Integer, ForeignKey("folders.id", ondelete="CASCADE"), nullable=True)
+    filename = Column(String, nullable=False)
+    archive_object = Column(String, nullable=False)
+    # queued -> running -> completed | failed
+    status = Column(String, nullable=False, default="queued", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    files_total = Column(Integer, nullable=False, default=0)
+    files_done = Column(Integer, nullable=False, default=0)
+    bytes_total = Column(BigInteger, nullable=False, default=0)
+    bytes_done = Column(BigInteger, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    root_folder_id = Column(Integer, ForeignKey("folders.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
 
 class Favorite(Base):
@@ -0,0 +1,32 @@
+import sys
+import logging
+from app.db.database import SessionLocal
+from app.utils.folders_utils import recompute_folder_counters
+
+
+def repair_folder_counters(root_ids=None) -> int:
+    """
+    Recompute the denormalized folder counters from the `files` and `folders`
+    tables and commit them.
+
+    Run it after restoring a backup, editing rows by hand, or whenever the
+    counters are suspected to have drifted. Writes that commit while it runs
+    may be overwritten with the state it read, so prefer a quiet period.
+
+    Args:
+        root_ids: Folder IDs whose subtrees are repaired; None repairs every folder.
+
+    Returns:
+        int: Number of folders updated.
+    """
+    with SessionLocal() as db:
+        updated = recompute_folder_counters(db, root_ids)
+        db.commit()
+    logging.info(f"Recomputed counters of {updated} folders")
+    return updated
+
+
+if __name__ == "__main__":
+    # python -m app.jobs.folder_counters [folder_id ...]
+    ids = [int(arg) for arg in sys.argv[1:]] or None
+    print(f"Recomputed counters of {repair_folder_counters(ids)} folders")
@@ -0,0 +1,297 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+import threading
+from typing import Optional
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from sqlalchemy import update
+from app.db import models
+from app.db.database import SessionLocal
+from app.core.config import settings
+from app.storage import minio_client
+from app.utils.zip_utils import ingest_zip
+
+# Staged archives waiting for a worker live in MinIO under this prefix
+ARCHIVE_PREFIX = "ingest/"
+
+# Minimum number of seconds between two progress writes for the same job
+PROGRESS_INTERVAL = 1.0
+
+_executor = ThreadPoolExecutor(max_workers=max(1, settings.INGEST_WORKERS), thread_name_prefix="ingest")
+
+
+class JobProgress:
+    """
+    Thread-safe progress reporter for one job.
+
+    The ingest itself runs in a single uncommitted transaction, so progress is
+    written through short sessions of its own, at most once per `PROGRESS_INTERVAL`.
+    Each write also refreshes `updated_at`, which marks the job as alive.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.files_done = 0
+        self.bytes_done = 0
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def start(self, files_total: int, bytes_total: int) -> None:
+        _update_job(self.job_id, files_total=files_total, bytes_total=bytes_total)
+
+    def advance(self, size: int) -> None:
+        with self._lock:
+            self.files_done += 1
+            self.bytes_done += size
+            if time.monotonic() - self._last_flush >= PROGRESS_INTERVAL:
+                self.flush()
+
+    def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        _update_job(self.job_id, files_done=self.files_done, bytes_done=self.bytes_done)
+
+
+class JobHeartbeat:
+    """
+    Keep a running job marked as alive while it is being processed.
+
+    Progress writes only happen between archive members, so downloading the
+    archive or uploading one large member could otherwise look like a dead
+    worker to the reaper. A background thread refreshes `updated_at` every
+    `INGEST_HEARTBEAT_SECONDS` for as long as the context is entered.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"ingest-heartbeat-{job_id}", daemon=True)
+
+    def __enter__(self) -> "JobHeartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(settings.INGEST_HEARTBEAT_SECONDS):
+            try:
+                with SessionLocal() as db:
+                    db.execute(
+                        update(models.IngestJob)
+                        .where(models.IngestJob.id == self.job_id, models.IngestJob.status == "running")
+                        .values(updated_at=datetime.utcnow())
+                    )
+                    db.commit()
+            except Exception as e:
+                logging.error(f"Heartbeat of ingestion job {self.job_id} failed: {e}")
+
+
+def _update_job(job_id: str, **values) -> int:
+    """
+    Update a job row in its own short transaction and return the number of rows changed.
+    """
+    with SessionLocal() as db:
+        result = db.execute(
+            update(models.IngestJob)
+            .where(models.IngestJob.id == job_id)
+            .values(updated_at=datetime.utcnow(), **values)
+        )
+        db.commit()
+        return result.rowcount
+
+
+class JobSuperseded(Exception):
+    """
+    Raised when a job was requeued and claimed again while this worker was still running it.
+    """
+
+
+def _claim_job(job_id: str) -> Optional[int]:
+    """
+    Atomically move a queued job to running, so only one worker processes it.
+
+    Returns:
+        int | None: The attempt number this worker owns, or None if the job was not queued.
+    """
+    with SessionLocal() as db:
+        result = db.execute(
+            update(models.IngestJob)
+            .where(models.IngestJob.id == job_id, models.IngestJob.status == "queued")
+            .values(
+                status="running",
+                attempts=models.IngestJob.attempts + 1,
+                files_done=0,
+                bytes_done=0,
+                updated_at=datetime.utcnow()
+            )
+            .returning(models.IngestJob.attempts)
+        )
+        attempt = result.scalar()
+        db.commit()
+        return attempt
+
+
+def _owned_by(job_id: str, attempt: int):
+    return (
+        models.IngestJob.id == job_id,
+        models.IngestJob.status == "running",
+        models.IngestJob.attempts == attempt
+    )
+
+
+def run_job(job_id: str) -> None:
+    """
+    Process one queued ingestion job: fetch the staged archive into a local
+    temporary file, ingest it, and record the outcome.
+
+    The job is marked completed in the ingest's own transaction, and only if
+    this worker still owns the attempt it claimed. A crash after that commit
+    leaves a completed job that is never run again; a worker whose job was
+    requeued meanwhile rolls its ingest back instead of creating a second tree.
+    """
+    attempt = _claim_job(job_id)
+    if attempt is None:
+        return
+
+    progress = JobProgress(job_id)
+
+    def complete_in_transaction(root_folder_id: int) -> None:
+        result = db.execute(
+            update(models.IngestJob)
+            .where(*_owned_by(job_id, attempt))
+            .values(status="completed", root_folder_id=root_folder_id, updated_at=datetime.utcnow())
+        )
+        if result.rowcount != 1:
+            raise JobSuperseded(f"Ingestion job {job_id} was taken over by another worker")
+
+    with SessionLocal() as db:
+        job = db.get(models.IngestJob, job_id)
+        try:
+            parent_folder = db.get(models.Folder, job.parent_folder_id) if job.parent_folder_id else None
+
+            with JobHeartbeat(job_id), tempfile.TemporaryFile() as archive:
+                stream = minio_client.download_file(job.archive_object)
+                try:
+                    shutil.copyfileobj(stream, archive, 1024 * 1024)
+                finally:
+                    stream.close()
+                    stream.release_conn()
+                archive.seek(0)
+
+                root_name = os.path.splitext(job.filename)[0]
+                ingest_zip(
+                    db, archive, root_name, parent_folder, job.owner_id, progress,
+                    before_commit=complete_in_transaction
+                )
+        except JobSuperseded as e:
+            # The archive and the job now belong to the worker that claimed it again
+            db.rollback()
+            logging.warning(str(e))
+            return
+        except Exception as e:
+            db.rollback()
+            logging.error(f"Ingestion job {job_id} failed: {e}")
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            with SessionLocal() as status_db:
+                failed = status_db.execute(
+                    update(models.IngestJob)
+                    .where(*_owned_by(job_id, attempt))
+                    .values(status="failed", error=str(error), updated_at=datetime.utcnow())
+                ).rowcount
+                status_db.commit()
+            if not failed:
+                return
+        else:
+            progress.flush()
+
+        _remove_archive(job.archive_object)
+
+
+def _remove_archive(archive_object: str) -> None:
+    try:
+        minio_client.delete_file(archive_object)
+    except Exception as e:
+        logging.error(f"Failed to remove staged archive {archive_object}: {e}")
+
+
+def submit(job_id: str) -> None:
+    """
+    Queue a job on the in-process worker pool.
+    """
+    _executor.submit(run_job, job_id)
+
+
+def recover_jobs(startup: bool = False) -> None:
+    """
+    Resume jobs left behind by a stopped process.
+
+    An ingest commits its folders, files and the job's completion in one
+    transaction, so a job still marked running left nothing behind and can
+    simply run again; a completed job is never picked up. Running jobs without a
+    heartbeat for `INGEST_STALE_SECONDS` are requeued, or failed once they have
+    used up `INGEST_MAX_ATTEMPTS`. Requeued jobs are submitted to the pool,
+    along with every queued job at startup and, afterwards, queued jobs nobody
+    has claimed for `INGEST_STALE_SECONDS` (e.g. accepted by a process that
+    stopped before running them). Claiming is atomic, so a job submitted by
+    several processes still runs once.
+
+    Args:
+        startup (bool): Whether this is the first sweep of the process.
+    """
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=settings.INGEST_STALE_SECONDS)
+    with SessionLocal() as db:
+        stale = db.query(models.IngestJob).filter(
+            models.IngestJob.status == "running",
+            models.IngestJob.updated_at < stale_before
+        ).with_for_update(skip_locked=True).all()
+        abandoned = []
+        for job in stale:
+            if job.attempts >= settings.INGEST_MAX_ATTEMPTS:
+                job.status = "failed"
+                job.error = "Ingestion was interrupted too many times"
+                abandoned.append(job.archive_object)
+            else:
+                job.status = "queued"
+                # Backdated so the queued sweep below picks it up right away
+                job.updated_at = stale_before
+        db.flush()
+
+        queued = db.query(models.IngestJob).filter(models.IngestJob.status == "queued")
+        if not startup:
+            queued = queued.filter(models.IngestJob.updated_at <= stale_before)
+        queued = queued.with_for_update(skip_locked=True).all()
+        for job in queued:
+            job.updated_at = now
+        queued_ids = [job.id for job in queued]
+        db.commit()
+
+    for archive_object in abandoned:
+        _remove_archive(archive_object)
+
+    for job_id in queued_ids:
+        submit(job_id)
+
+
+def _reap_periodically() -> None:
+    while True:
+        time.sleep(settings.INGEST_REAP_INTERVAL_SECONDS)
+        try:
+            recover_jobs()
+        except Exception as e:
+            logging.error(f"Ingestion job sweep failed: {e}")
+
+
+def start_recovery() -> None:
+    """
+    Resume jobs left behind by a previous run, then keep sweeping for
+    abandoned jobs every `INGEST_REAP_INTERVAL_SECONDS` in a daemon thread.
+    """
+    recover_jobs(startup=True)
+    threading.Thread(target=_reap_periodically, name="ingest-reaper", daemon=True).start()
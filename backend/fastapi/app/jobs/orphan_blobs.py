@@ -0,0 +1,89 @@
+import re
+import sys
+import time
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy.dialects.postgresql import insert
+from app.db import models
+from app.db.database import SessionLocal
+from app.core.config import settings
+from app.storage import minio_client
+
+# Objects checked against the database per transaction
+SWEEP_BATCH_SIZE = 1000
+
+_BLOB_NAME = re.compile(re.escape(models.BLOB_PREFIX) + r"([0-9a-f]{64})")
+
+
+def sweep_orphan_blobs(grace_seconds: Optional[int] = None) -> int:
+    """
+    Remove content-addressed objects that have no `Blob` row and are older
+    than the grace period (`BLOB_ORPHAN_GRACE_SECONDS` by default).
+
+    Uploads write blob objects before taking their references, so a crash or
+    a rolled back batch in between leaves objects nothing points to. Each
+    candidate is claimed with a placeholder row before its object is removed:
+    an upload referencing the same content meanwhile waits on that row, then
+    finds its blob new and rewrites the object (see `blob_utils._ensure_object`).
+
+    Returns:
+        int: Number of objects removed.
+    """
+    grace = settings.BLOB_ORPHAN_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace)
+
+    removed = 0
+    candidates = {}
+    for obj in minio_client.list_objects(models.BLOB_PREFIX):
+        match = _BLOB_NAME.fullmatch(obj.object_name)
+        if not match or obj.last_modified is None or obj.last_modified > cutoff:
+            continue
+        candidates[match.group(1)] = obj.size or 0
+        if len(candidates) >= SWEEP_BATCH_SIZE:
+            removed += _remove_orphans(candidates)
+            candidates = {}
+    if candidates:
+        removed += _remove_orphans(candidates)
+    return removed
+
+
+def _remove_orphans(sizes: dict[str, int]) -> int:
+    with SessionLocal() as db:
+        # Rows are inserted in hash order, like `acquire_blobs`, to avoid deadlocks
+        now = datetime.utcnow()
+        stmt = insert(models.Blob).values([
+            {"sha256": sha256, "size": size, "ref_count": 0, "created_at": now}
+            for sha256, size in sorted(sizes.items())
+        ]).on_conflict_do_nothing(index_elements=[models.Blob.sha256]).returning(models.Blob.sha256)
+        orphaned = db.execute(stmt).scalars().all()
+
+        failures = minio_client.delete_files([models.BLOB_PREFIX + sha256 for sha256 in orphaned])
+        # The placeholder rows only served as locks
+        db.rollback()
+    return len(orphaned) - len(failures)
+
+
+def _sweep_periodically() -> None:
+    while True:
+        time.sleep(settings.BLOB_ORPHAN_SWEEP_SECONDS)
+        try:
+            removed = sweep_orphan_blobs()
+            if removed:
+                logging.info(f"Removed {removed} orphaned blob objects")
+        except Exception as e:
+            logging.error(f"Orphaned blob sweep failed: {e}")
+
+
+def start_sweeper() -> None:
+    """
+    Remove orphaned blob objects every `BLOB_ORPHAN_SWEEP_SECONDS` in a daemon thread.
+    """
+    threading.Thread(target=_sweep_periodically, name="orphan-blob-sweeper", daemon=True).start()
+
+
+if __name__ == "__main__":
+    # python -m app.jobs.orphan_blobs [grace_seconds]
+    grace_seconds = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    print(f"Removed {sweep_orphan_blobs(grace_seconds)} orphaned blob objects")
@@ -0,0 +1,69 @@
+import time
+import logging
+import threading
+from datetime import datetime
+from app.db import models
+from app.db.database import SessionLocal
+from app.core.config import settings
+from app.utils.upload_utils import discard_session_upload
+
+# Sessions locked and discarded per transaction
+EXPIRE_BATCH_SIZE = 100
+
+
+def expire_upload_sessions() -> int:
+    """
+    Discard upload sessions past their `expires_at`: abort their MinIO
+    multipart uploads (or remove the object of a presigned single-PUT session)
+    and delete their rows.
+
+    Sessions are locked with SKIP LOCKED, so several processes can sweep at
+    once. A session whose upload cannot be discarded is kept for the next sweep.
+
+    Returns:
+        int: Number of sessions removed.
+    """
+    removed = 0
+    while True:
+        with SessionLocal() as db:
+            expired = db.query(models.UploadSession).filter(
+                models.UploadSession.expires_at <= datetime.utcnow()
+            ).order_by(models.UploadSession.expires_at).limit(EXPIRE_BATCH_SIZE).with_for_update(skip_locked=True).all()
+
+            discarded = 0
+            for upload_session in expired:
+                try:
+                    discard_session_upload(upload_session)
+                except Exception as e:
+                    logging.error(f"Failed to discard upload of expired session {upload_session.id}: {e}")
+                    continue
+                db.delete(upload_session)
+                discarded += 1
+            db.commit()
+
+        removed += discarded
+        if len(expired) < EXPIRE_BATCH_SIZE or not discarded:
+            return removed
+
+
+def _sweep_periodically() -> None:
+    while True:
+        time.sleep(settings.UPLOAD_SESSION_SWEEP_SECONDS)
+        try:
+            removed = expire_upload_sessions()
+            if removed:
+                logging.info(f"Removed {removed} expired upload sessions")
+        except Exception as e:
+            logging.error(f"Upload session sweep failed: {e}")
+
+
+def start_sweeper() -> None:
+    """
+    Remove expired upload sessions every `UPLOAD_SESSION_SWEEP_SECONDS` in a daemon thread.
+    """
+    threading.Thread(target=_sweep_periodically, name="upload-session-sweeper", daemon=True).start()
+
+
+if __name__ == "__main__":
+    # python -m app.jobs.upload_sessions
+    print(f"Removed {expire_upload_sessions()} expired upload sessions")
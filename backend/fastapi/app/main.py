@@ -6,8 +6,9 @@ from sqlalchemy.orm import Session
 from app.db import models, database
 from app.db.database import get_db
 from app.auth import jwt, users
-from app.routes import files, folders, favorites, upload
+from app.routes import files, folders, favorites, upload, upload_sessions
 from app.storage import minio_client
+from app.jobs import ingest, orphan_blobs, upload_sessions as upload_session_jobs
 
 
 app = FastAPI(
@@ -32,6 +33,7 @@ app.include_router(files.router)
 app.include_router(folders.router)
 app.include_router(favorites.router)
 app.include_router(upload.router)
+app.include_router(upload_sessions.router)
 
 # Initialize database schema
 models.Base.metadata.create_all(bind=database.engine)
@@ -39,6 +41,15 @@ models.Base.metadata.create_all(bind=database.engine)
 # Create MinIO bucket
 minio_client.create_bucket()
 
+# Resume ZIP ingestion jobs left behind by a previous run and keep reaping abandoned ones
+ingest.start_recovery()
+
+# Abort upload sessions left unfinished past their TTL
+upload_session_jobs.start_sweeper()
+
+# Remove blob objects left without a database row by interrupted uploads
+orphan_blobs.start_sweeper()
+
 
 
 @app.get("/health", tags=["Health Check"])
@@ -172,6 +172,7 @@ def get_favorites(
     - Fetches all favorite entries for the user.
     - Separates file and folder favorites.
     - Returns detailed file info and folder info with item count.
+    - Uses two queries in total; folder item counts come from the folders' counters.
 
     Args:
         db (Session): SQLAlchemy session dependency.
@@ -182,49 +183,45 @@ def get_favorites(
             - `files`: List of FileInfo objects for favorited files.
             - `folders`: List of FolderInfo objects for favorited folders (with item counts).
     """
-    # Query all favorites for the user
-    favorites = db.query(models.Favorite).filter(
-        models.Favorite.user_id == user_id
-    ).all()
-
-    # Split into file and folder IDs
-    file_ids = [fav.file_id for fav in favorites if fav.file_id]
-    folder_ids = [fav.folder_id for fav in favorites if fav.folder_id]
+    # Favorited file and folder IDs, resolved inside the queries below
+    favorite_file_ids = db.query(models.Favorite.file_id).filter(
+        models.Favorite.user_id == user_id,
+        models.Favorite.file_id.isnot(None)
+    ).scalar_subquery()
+    favorite_folder_ids = db.query(models.Favorite.folder_id).filter(
+        models.Favorite.user_id == user_id,
+        models.Favorite.folder_id.isnot(None)
+    ).scalar_subquery()
 
     # Fetch and convert files
-    files: List[FileInfo] = []
-    if file_ids:
-        db_files = db.query(models.File).filter(models.File.id.in_(file_ids)).all()
-        files = [
-            FileInfo(
-                id=file.id,
-                filename=file.filename,
-                upload_time=file.upload_time,
-                mime_type=file.mime_type,
-                size=file.size,
-                folder_id=file.folder_id,
-                date_modified=file.date_modified,
-            )
-            for file in db_files
-        ]
+    db_files = db.query(models.File).filter(models.File.id.in_(favorite_file_ids)).all()
+    files: List[FileInfo] = [
+        FileInfo(
+            id=file.id,
+            filename=file.filename,
+            upload_time=file.upload_time,
+            mime_type=file.mime_type,
+            size=file.size,
+            folder_id=file.folder_id,
+            date_modified=file.date_modified,
+        )
+        for file in db_files
+    ]
 
     # Fetch and convert folders with item_count
-    folders: List[FolderInfo] = []
-    if folder_ids:
-        db_folders = db.query(models.Folder).filter(models.Folder.id.in_(folder_ids)).all()
-        for folder in db_folders:
-            file_count = db.query(models.File).filter(models.File.folder_id == folder.id).count()
-            subfolder_count = db.query(models.Folder).filter(models.Folder.parent_id == folder.id).count()
-            folders.append(
-                FolderInfo(
-                    id=folder.id,
-                    name=folder.name,
-                    parent_id=folder.parent_id,
-                    created_at=folder.created_at,
-                    date_modified=folder.date_modified,
-                    item_count=file_count + subfolder_count,
-                )
-            )
+    folders: List[FolderInfo] = [
+        FolderInfo(
+            id=folder.id,
+            name=folder.name,
+            parent_id=folder.parent_id,
+            created_at=folder.created_at,
+            date_modified=folder.date_modified,
+            item_count=folder.item_count,
+            total_file_count=folder.total_file_count,
+            total_size=folder.total_size,
+        )
+        for folder in db.query(models.Folder).filter(models.Folder.id.in_(favorite_folder_ids)).all()
+    ]
 
     # Return structured response
     return FavoriteResponse(files=files, folders=folders)
\ No newline at end of file
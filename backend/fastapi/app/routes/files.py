@@ -1,16 +1,26 @@
-import io
+import uuid
 from typing import List
 from app.db import models
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.storage import minio_client
+from app.storage.object_cache import object_cache
 from app.schema.files import FileInfo
 from pydantic import BaseModel, Field
 from app.auth.jwt import get_current_user_id
-from fastapi.responses import StreamingResponse
-from fastapi import APIRouter, Depends, HTTPException
+from app.utils.blob_utils import release_file_object
+from app.utils.folders_utils import adjust_folder_counters
+from app.utils.http_utils import (
+    parse_range_header, if_range_matches, is_not_modified,
+    not_modified_response, validator_headers, version_etag
+)
+from app.core.config import settings
+from fastapi.responses import RedirectResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
 
 router = APIRouter()
@@ -27,6 +37,8 @@ router = APIRouter()
     )
 )
 def get_my_files(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ) -> List[FileInfo]:
@@ -37,9 +49,27 @@ def get_my_files(
     - Owned by the logged-in user
     - Not associated with any folder (folder_id is NULL)
 
+    The listing carries an `ETag` derived from the count, total size and latest
+    change of those files; a matching `If-None-Match` gets `304 Not Modified`.
+    No `Last-Modified` is sent, since deleting a root file leaves no timestamp behind.
+
     Returns:
         List[FileInfo]: List of metadata for files located in the root directory.
     """
+    count, total_size, latest = db.query(
+        func.count(models.File.id),
+        func.coalesce(func.sum(models.File.size), 0),
+        func.max(func.coalesce(models.File.date_modified, models.File.upload_time))
+    ).filter(
+        models.File.owner_id == user_id,
+        models.File.folder_id == None
+    ).one()
+
+    etag = version_etag(user_id, count, total_size, latest)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers.update(validator_headers(etag))
+
     # Query all files owned by the user where folder_id is None (i.e., root)
     files = db.query(models.File).filter(
         models.File.owner_id == user_id,
@@ -135,21 +165,70 @@ def delete_file(
         ).first()
         if folder:
             folder.date_modified = datetime.utcnow()
+        adjust_folder_counters(
+            db, db_file.folder_id, files=-1, total_files=-1, total_size=-(db_file.size or 0)
+        )
 
-    # Attempt to delete the file from MinIO storage
-    try:
-        minio_client.delete_file(file_id)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"MinIO deletion failed: {str(e)}")
-
-    # Delete the file record from the database
+    # Delete the file record (and favorites pointing at it) from the database
+    db.query(models.Favorite).filter(models.Favorite.file_id == db_file.id).delete(synchronize_session=False)
     db.delete(db_file)
+    db.flush()
+
+    # Drop the file's reference to its object; MinIO content is removed once no file uses it
+    object_name = release_file_object(db, db_file)
+    if object_name:
+        object_cache.invalidate(object_name)
+        try:
+            minio_client.delete_file(object_name)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"MinIO deletion failed: {str(e)}")
+
     db.commit()
 
     return {"message": f"File '{db_file.filename}' deleted successfully"}
 
 
 
+def _file_etag(db: Session, db_file: models.File) -> str:
+    """
+    Return a file's ETag. Rows written before ETags were recorded get theirs
+    from MinIO once, and it is stored for later requests.
+    """
+    if db_file.etag is None:
+        try:
+            stat = minio_client.stat_file(db_file.object_name)
+        except RuntimeError as e:
+            raise HTTPException(status_code=500, detail=f"Failed to retrieve file: {e}")
+        if not stat:
+            raise HTTPException(status_code=404, detail="File content not found")
+        db_file.etag = stat.etag
+        db.commit()
+    return db_file.etag
+
+
+def _byteranges_part_header(boundary: str, content_type: str, start: int, end: int, size: int) -> bytes:
+    return (
+        f"--{boundary}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+    ).encode()
+
+
+def _iter_byteranges(object_name: str, etag: str, ranges, size: int, content_type: str, boundary: str):
+    """
+    Yield a `multipart/byteranges` body, reading only the requested bytes of each range.
+    """
+    for start, end in ranges:
+        yield _byteranges_part_header(boundary, content_type, start, end, size)
+        reader = object_cache.read_object(object_name, etag, size, start, end - start + 1)
+        try:
+            yield from reader
+        finally:
+            reader.close()
+        yield b"\r\n"
+    yield f"--{boundary}--\r\n".encode()
+
+
 @router.get(
     "/myfiles/download/{file_id}", 
     summary="Download your file using ID",
@@ -158,6 +237,11 @@ def delete_file(
 )
 def download_file(
     file_id: str,
+    request: Request,
+    redirect: bool = Query(
+        default=False,
+        description="Redirect to a short-lived presigned MinIO URL instead of streaming through the API"
+    ),
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
@@ -167,16 +251,36 @@ def download_file(
     This endpoint verifies ownership of the file, fetches it from MinIO storage,
     and streams it back to the client with the correct MIME type and filename.
 
+    `Range` requests (single or multiple ranges, optionally guarded by `If-Range`)
+    are answered with `206 Partial Content`, and only the requested bytes are
+    read from MinIO.
+
+    Content is read through the object cache, so frequently downloaded files
+    are served from memory or local disk instead of MinIO.
+
+    Responses carry the stored `ETag` and `Last-Modified`; a request whose
+    `If-None-Match` / `If-Modified-Since` still matches gets `304 Not Modified`
+    without MinIO being contacted.
+
+    With `redirect=true` the server only checks ownership and answers with a
+    `302` to a presigned MinIO URL valid for `PRESIGNED_DOWNLOAD_EXPIRY_SECONDS`,
+    which keeps the original filename and MIME type. The client then fetches
+    (and range-requests) the content from MinIO directly.
+
     Args:
         file_id (str): The unique identifier of the file to download.
+        request (Request): Incoming request, used for the conditional and `Range` headers.
+        redirect (bool): Redirect to a presigned URL instead of streaming the content.
         db (Session): Database session (injected dependency).
         user_id (int): The ID of the authenticated user (injected dependency).
 
     Returns:
-        StreamingResponse: Streaming the file content with appropriate headers.
+        StreamingResponse | RedirectResponse: The file content with appropriate
+            headers, or a redirect to it.
 
     Raises:
         HTTPException(404): If the file is not found or does not belong to the user.
+        HTTPException(416): If none of the requested ranges overlap the file.
         HTTPException(500): If there is an error retrieving the file from MinIO.
     """
     # Fetch the file from the database and confirm ownership
@@ -188,19 +292,84 @@ def download_file(
     if not db_file:
         raise HTTPException(status_code=404, detail="File not found or access denied")
 
+    media_type = db_file.mime_type or "application/octet-stream"
+
+    if redirect:
+        url = minio_client.presigned_get_url(
+            db_file.object_name,
+            timedelta(seconds=settings.PRESIGNED_DOWNLOAD_EXPIRY_SECONDS),
+            db_file.filename,
+            media_type
+        )
+        # The URL is short-lived, so the redirect must not be cached past it
+        return RedirectResponse(url, status_code=302, headers={"Cache-Control": "private, no-store"})
+
+    etag = _file_etag(db, db_file)
+    last_modified = db_file.date_modified or db_file.upload_time
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    headers = {
+        "Content-Disposition": f"attachment; filename={db_file.filename}",
+        "Accept-Ranges": "bytes",
+        **validator_headers(etag, last_modified)
+    }
+
+    ranges = None
+    range_header = request.headers.get("range")
+    if range_header and db_file.size:
+        ranges = parse_range_header(range_header, db_file.size)
+
     try:
-        # Download the file stream from MinIO using file ID (object name)
-        file_stream = minio_client.download_file(file_id)
+        # A stale If-Range validator means the client must get the whole file again
+        if_range = request.headers.get("if-range")
+        if ranges and if_range and not if_range_matches(if_range, etag, last_modified):
+            ranges = None
+
+        if ranges and len(ranges) == 1:
+            start, end = ranges[0]
+            reader = object_cache.read_object(db_file.object_name, etag, db_file.size, start, end - start + 1)
+            headers["Content-Range"] = f"bytes {start}-{end}/{db_file.size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                content=reader,
+                status_code=206,
+                media_type=media_type,
+                headers=headers,
+                background=BackgroundTask(reader.close)
+            )
+
+        if ranges:
+            boundary = uuid.uuid4().hex
+            headers["Content-Length"] = str(sum(
+                len(_byteranges_part_header(boundary, media_type, start, end, db_file.size)) + (end - start + 1) + 2
+                for start, end in ranges
+            ) + len(f"--{boundary}--\r\n"))
+            body = _iter_byteranges(db_file.object_name, etag, ranges, db_file.size, media_type, boundary)
+            return StreamingResponse(
+                content=body,
+                status_code=206,
+                media_type=f"multipart/byteranges; boundary={boundary}",
+                headers=headers,
+                background=BackgroundTask(body.close)
+            )
+
+        # Read the whole file from the cache, or from MinIO on a miss
+        reader = object_cache.read_object(db_file.object_name, etag, db_file.size)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve file: {e}")
 
-    # Return a StreamingResponse to send the file contents to the client
+    # Relay the object in fixed-size chunks; a MinIO response is released when
+    # the transfer finishes or the client disconnects
+    if db_file.size is not None:
+        headers["Content-Length"] = str(db_file.size)
     return StreamingResponse(
-        content=io.BytesIO(file_stream.read()),
-        media_type=db_file.mime_type or "application/octet-stream",
-        headers={
-            "Content-Disposition": f"attachment; filename={db_file.filename}"
-        }
+        content=reader,
+        media_type=media_type,
+        headers=headers,
+        background=BackgroundTask(reader.close)
     )
 
 
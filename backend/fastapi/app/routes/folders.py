@@ -1,20 +1,21 @@
-import os
-import io
-import logging
 from app.db import models
 from datetime import datetime
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from pydantic import BaseModel, Field
-from typing import Optional, Union, List
+from typing import Optional, Union, List, Literal
 from app.auth.jwt import get_current_user_id
-from fastapi.responses import StreamingResponse
-from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED
-from app.schema.folders import FolderInfo, FolderDetails, SubFolderInfo
-from fastapi import APIRouter, Depends, HTTPException
-from app.utils.folders_utils import delete_folder_recursive
-from app.storage.minio_client import download_file as minio_download_file
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from app.schema.folders import FolderInfo, FolderDetails, SubFolderInfo, FolderBreadcrumb, FolderTreeNode
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from app.utils.folders_utils import (
+    delete_folder_recursive, walk_folder_files, folder_version, adjust_folder_counters,
+    set_folder_path, move_folder, folder_ancestors, folder_tree
+)
+from app.utils.http_utils import is_not_modified, not_modified_response, validator_headers
+from app.utils.archive_utils import ARCHIVE_FORMATS, ArchiveEntry, stream_archive, unique_path
 
 
 router = APIRouter()
@@ -76,6 +77,8 @@ def create_folder(
     )
 
     db.add(new_folder)
+    set_folder_path(db, new_folder, parent_folder)
+    adjust_folder_counters(db, parent_id, subfolders=1)
     db.commit()
     db.refresh(new_folder)
 
@@ -109,35 +112,67 @@ def get_my_folders(
 ) -> List[FolderInfo]:
     """
     Fetch all top-level folders for the current authenticated user,
-    along with the count of direct files and subfolders they contain.
+    along with the count of direct files and subfolders they contain
+    and their recursive totals, read from the folders' counters.
     """
     top_folders = db.query(models.Folder).filter(
         models.Folder.owner_id == user_id,
         models.Folder.parent_id.is_(None)
-    ).all()
+    ).order_by(models.Folder.id).all()
 
-    result = []
-    for folder in top_folders:
-        file_count = db.query(models.File).filter(
-            models.File.folder_id == folder.id,
-            models.File.owner_id == user_id
-        ).count()
-        
-        subfolder_count = db.query(models.Folder).filter(
-            models.Folder.parent_id == folder.id,
-            models.Folder.owner_id == user_id
-        ).count()
-
-        result.append(FolderInfo(
+    return [
+        FolderInfo(
             id=folder.id,
             name=folder.name,
             parent_id=folder.parent_id,
             created_at=folder.created_at,
             date_modified=folder.date_modified,
-            item_count=file_count + subfolder_count
-        ))
+            item_count=folder.item_count,
+            total_file_count=folder.total_file_count,
+            total_size=folder.total_size
+        )
+        for folder in top_folders
+    ]
+
+
+
+@router.get(
+    "/folders/tree",
+    response_model=List[FolderTreeNode],
+    tags=["Folders"],
+    summary="Get the user's folder hierarchy as nested JSON",
+    description="Returns all of the user's folders, or the subtree of `root_id`, nested under their parents, "
+                "optionally cut at a depth and optionally with each folder's files."
+)
+def get_folder_tree(
+    root_id: Optional[int] = Query(None, description="Folder to start from; omit for all top-level folders"),
+    depth: Optional[int] = Query(None, ge=0, description="Levels to include below the top; omit for no limit"),
+    include_files: bool = Query(False, description="Whether to list the files of each folder"),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+) -> JSONResponse:
+    """
+    Fetch a whole folder hierarchy in one request.
+
+    Folders come from a single query over the path index (plus one for files
+    when `include_files` is set) and carry their stored counters. The nested
+    dicts are returned as they are, skipping per-node model validation, which
+    matters for trees with tens of thousands of folders.
+
+    Args:
+        root_id (Optional[int]): Folder to start from; None for all top-level folders.
+        depth (Optional[int]): Levels to include below the top; None for no limit.
+        include_files (bool): Whether to list each folder's files.
+        db (Session): Database session.
+        user_id (int): ID of the authenticated user.
+
+    Raises:
+        HTTPException 404: If `root_id` does not exist or is not owned by the user.
 
-    return result
+    Returns:
+        JSONResponse: The top-level nodes, or just `root_id`'s node, with nested `children`.
+    """
+    return JSONResponse(content=folder_tree(db, user_id, root_id, depth, include_files))
 
 
 
@@ -150,6 +185,8 @@ def get_my_folders(
 )
 def get_folder_details(
     folder_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ) -> FolderDetails:
@@ -157,6 +194,11 @@ def get_folder_details(
     Retrieve detailed information about a specific folder owned by the user,
     including its metadata, the list of files it contains, and its direct subfolders.
 
+    The response carries an `ETag` computed by an aggregate query; a matching
+    `If-None-Match` gets a `304 Not Modified` before the listing is loaded. No
+    `Last-Modified` is sent, since the recursive totals change without any
+    timestamp moving, so date-based revalidation could serve stale totals.
+
     Returns:
         FolderDetails: Folder metadata along with lists of files and subfolders.
     """
@@ -168,6 +210,11 @@ def get_folder_details(
     if not folder:
         raise HTTPException(status_code=404, detail="Folder not found")
 
+    etag = folder_version(db, folder, user_id)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers.update(validator_headers(etag))
+
     # Fetch files and subfolders
     files = db.query(models.File).filter(
         models.File.folder_id == folder_id,
@@ -177,28 +224,22 @@ def get_folder_details(
     raw_subfolders = db.query(models.Folder).filter(
         models.Folder.parent_id == folder_id,
         models.Folder.owner_id == user_id
-    ).all()
-
-    subfolders = []
-    for subfolder in raw_subfolders:
-        sub_files_count = db.query(models.File).filter(
-            models.File.folder_id == subfolder.id,
-            models.File.owner_id == user_id
-        ).count()
+    ).order_by(models.Folder.id).all()
 
-        sub_subfolders_count = db.query(models.Folder).filter(
-            models.Folder.parent_id == subfolder.id,
-            models.Folder.owner_id == user_id
-        ).count()
-
-        subfolders.append(SubFolderInfo(
+    # Item counts and totals come from the subfolders' counters
+    subfolders = [
+        SubFolderInfo(
             id=subfolder.id,
             name=subfolder.name,
             parent_id=subfolder.parent_id,
             created_at=subfolder.created_at,
             date_modified=subfolder.date_modified,
-            item_count=sub_files_count + sub_subfolders_count
-        ))
+            item_count=subfolder.item_count,
+            total_file_count=subfolder.total_file_count,
+            total_size=subfolder.total_size
+        )
+        for subfolder in raw_subfolders
+    ]
 
     # Count = total of files + subfolders
     item_count = len(files) + len(subfolders)
@@ -212,7 +253,9 @@ def get_folder_details(
         date_modified=folder.date_modified,
         files=files,
         subfolders=subfolders,
-        item_count=item_count
+        item_count=item_count,
+        total_file_count=folder.total_file_count,
+        total_size=folder.total_size
     )
 
 
@@ -235,6 +278,10 @@ def delete_folder(
     """
     Recursively delete a folder along with all nested files and subfolders.
 
+    The subtree is removed with set-based statements and the objects through
+    MinIO's multi-object delete; objects MinIO failed to remove are listed in
+    `failed_objects` (their records are deleted regardless).
+
     Args:
         folder_id (int): ID of the folder to delete.
         db (Session): Database session.
@@ -256,8 +303,11 @@ def delete_folder(
     parent_id = folder.parent_id
     folder_name = folder.name
 
-    # Call recursive deletion helper function
-    delete_folder_recursive(db, folder_id, user_id)
+    # Delete the whole subtree and take its files off the ancestors' totals
+    deletion = delete_folder_recursive(db, folder_id, user_id)
+    adjust_folder_counters(
+        db, parent_id, subfolders=-1, total_files=-deletion.file_count, total_size=-deletion.total_size
+    )
 
     # Update parent's date_modified timestamp if parent exists
     if parent_id:
@@ -270,7 +320,12 @@ def delete_folder(
 
     db.commit()
 
-    return {"message": f"Folder '{folder_name}' and all its contents have been deleted."}
+    response = {"message": f"Folder '{folder_name}' and all its contents have been deleted."}
+    if deletion.failed_objects:
+        response["failed_objects"] = [
+            {"object_name": object_name, "error": error} for object_name, error in deletion.failed_objects
+        ]
+    return response
 
 
 
@@ -352,27 +407,157 @@ def rename_folder(
 
 
 
+class MoveFolderRequest(BaseModel):
+    """
+    Request model for moving a folder.
+
+    Attributes:
+        folder_id (int): ID of the folder to move.
+        new_parent_id (Optional[int]): ID of the destination folder, or None for the root level.
+    """
+    folder_id: int
+    new_parent_id: Optional[int] = Field(default=None, description="Destination folder ID, None for the root level")
+
+@router.post(
+    "/folders/move",
+    response_model=FolderInfo,
+    tags=["Folders"],
+    summary="Move a folder into another folder or to the root level"
+)
+def move_folder_endpoint(
+    payload: MoveFolderRequest,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+) -> FolderInfo:
+    """
+    Move a folder, with all its subfolders and files, under another folder.
+
+    Args:
+        payload (MoveFolderRequest): The folder to move and its destination.
+        db (Session): Database session.
+        user_id (int): ID of the authenticated user.
+
+    Raises:
+        HTTPException 404: If either folder does not exist or is not owned by the user.
+        HTTPException 400: If the destination is the folder itself or one of its subfolders.
+
+    Returns:
+        FolderInfo: The moved folder.
+    """
+    # Lock the folder so its totals cannot change while they are moved
+    folder = db.query(models.Folder).filter(
+        models.Folder.id == payload.folder_id,
+        models.Folder.owner_id == user_id
+    ).with_for_update().first()
+
+    if not folder:
+        raise HTTPException(status_code=404, detail="Folder not found")
+
+    new_parent = None
+    if payload.new_parent_id is not None:
+        new_parent = db.query(models.Folder).filter(
+            models.Folder.id == payload.new_parent_id,
+            models.Folder.owner_id == user_id
+        ).first()
+        if not new_parent:
+            raise HTTPException(status_code=404, detail="Destination folder not found or access denied")
+
+    move_folder(db, folder, new_parent)
+    db.commit()
+    db.refresh(folder)
+
+    return FolderInfo(
+        id=folder.id,
+        name=folder.name,
+        parent_id=folder.parent_id,
+        created_at=folder.created_at,
+        date_modified=folder.date_modified,
+        item_count=folder.item_count,
+        total_file_count=folder.total_file_count,
+        total_size=folder.total_size
+    )
+
+
+
+@router.get(
+    "/folders/{folder_id}/breadcrumbs",
+    response_model=List[FolderBreadcrumb],
+    tags=["Folders"],
+    summary="Get the path from the top level down to a folder"
+)
+def get_folder_breadcrumbs(
+    folder_id: int,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+) -> List[FolderBreadcrumb]:
+    """
+    List a folder's ancestors from the top-level folder down, followed by the folder itself.
+
+    Raises:
+        HTTPException 404: If the folder does not exist or is not owned by the user.
+    """
+    folder = db.query(models.Folder).filter(
+        models.Folder.id == folder_id,
+        models.Folder.owner_id == user_id
+    ).first()
+
+    if not folder:
+        raise HTTPException(status_code=404, detail="Folder not found")
+
+    return [FolderBreadcrumb.model_validate(crumb) for crumb in folder_ancestors(db, folder) + [folder]]
+
+
+
+def _archive_entries(files) -> List[ArchiveEntry]:
+    """
+    Turn `(path, file)` pairs into archive entries, renaming clashing paths.
+    """
+    used = set()
+    return [
+        ArchiveEntry(
+            path=unique_path(path, used),
+            object_name=file.object_name,
+            size=file.size,
+            mime_type=file.mime_type,
+            modified=file.date_modified or file.upload_time,
+            etag=file.etag
+        )
+        for path, file in files
+    ]
+
+
 @router.get(
     "/folders/download/{folder_id}",
-    summary="Download a folder as a ZIP",
-    description="Recursively downloads a folder (including nested files and subfolders) as a compressed ZIP archive.",
+    summary="Download a folder as a ZIP or compressed tar",
+    description="Recursively downloads a folder (including nested files and subfolders) as a compressed "
+                "ZIP archive, or as a tar compressed with zstd or gzip across several cores.",
     tags=["Folders"]
 )
 def download_folder_as_zip(
     folder_id: int,
+    format: Literal["zip", "tar.zst", "tar.gz"] = Query(
+        default="zip",
+        description="Archive format: zip, tar.zst or tar.gz"
+    ),
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
     """
-    Recursively downloads all files in a folder (including nested subfolders) as a zip archive.
+    Recursively downloads all files in a folder (including nested subfolders) as an archive.
 
     Args:
         folder_id (int): The root folder ID to download.
+        format (str): Archive format, `zip` (default), `tar.zst` or `tar.gz`.
         db (Session): SQLAlchemy session.
         user_id (int): Authenticated user ID.
 
+    The archive is generated while it is sent: entries are written as their
+    objects are fetched from MinIO, so memory use stays bounded and the client
+    starts receiving bytes immediately. Tar exports are compressed on
+    `ARCHIVE_COMPRESSION_THREADS` threads.
+
     Returns:
-        StreamingResponse: In-memory zip file of the entire folder structure.
+        StreamingResponse: Streamed archive of the entire folder structure.
     """
     # Step 1: Fetch and validate root folder
     root_folder = db.query(models.Folder).filter(
@@ -383,46 +568,108 @@ def download_folder_as_zip(
     if not root_folder:
         raise HTTPException(status_code=404, detail="Folder not found or access denied")
 
-    zip_stream = io.BytesIO()
-
-    def add_folder_to_zip(zipf: ZipFile, current_folder: models.Folder, path_prefix=""):
-        # Add files in current folder
-        db_files = db.query(models.File).filter(
-            models.File.folder_id == current_folder.id,
-            models.File.owner_id == user_id
-        ).all()
-
-        for file in db_files:
-            try:
-                file_obj = minio_download_file(file.id)
-                file_path = os.path.join(path_prefix, file.filename)
-                file_bytes = file_obj.read()
-
-                zip_info = ZipInfo(file_path)
-                zip_info.compress_type = ZIP_DEFLATED
-                zipf.writestr(zip_info, file_bytes)
-            except Exception as e:
-                logging.error(f"Error downloading file {file.filename} from MinIO: {e}")
-
-        # Recursively add subfolders
-        subfolders = db.query(models.Folder).filter(
-            models.Folder.parent_id == current_folder.id,
-            models.Folder.owner_id == user_id
-        ).all()
+    # Step 2: Collect the file metadata up front so the stream never needs the DB session
+    entries = _archive_entries(walk_folder_files(db, [root_folder.id], user_id))
 
-        for subfolder in subfolders:
-            add_folder_to_zip(zipf, subfolder, os.path.join(path_prefix, subfolder.name))
+    # Step 3: Stream the archive while the objects are fetched
+    media_type, extension = ARCHIVE_FORMATS[format]
+    body = stream_archive(entries, format)
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={root_folder.name}{extension}"
+        },
+        background=BackgroundTask(body.close)
+    )
 
-    # Step 2: Build ZIP archive
-    with ZipFile(zip_stream, mode="w", compression=ZIP_DEFLATED) as zipf:
-        add_folder_to_zip(zipf, root_folder, root_folder.name)
 
-    zip_stream.seek(0)
 
+class SelectionDownloadRequest(BaseModel):
+    """
+    Request schema for downloading a selection of files and folders.
+
+    Attributes:
+        file_ids (List[str]): IDs of the files to include.
+        folder_ids (List[int]): IDs of the folders to include with all their contents.
+        format (str): Archive format, `zip`, `tar.zst` or `tar.gz`.
+    """
+    file_ids: List[str] = Field(default_factory=list, max_length=1000, description="IDs of the files to include")
+    folder_ids: List[int] = Field(default_factory=list, max_length=1000, description="IDs of the folders to include")
+    format: Literal["zip", "tar.zst", "tar.gz"] = Field(default="zip", description="Archive format")
+
+@router.post(
+    "/folders/download",
+    summary="Download a selection of files and folders as one archive",
+    description="Streams a single archive containing exactly the selected files and folders "
+                "(recursively), all of which must belong to the authenticated user.",
+    tags=["Folders"]
+)
+def download_selection(
+    payload: SelectionDownloadRequest,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    """
+    Download several files and folders, possibly from different places, as one archive.
+
+    Selected files are placed at the top of the archive and each selected folder
+    under its own name; folders and files that are inside another selected
+    folder only appear there. Ownership and metadata come from a fixed number of bulk
+    queries whatever the size of the selection; clashing names get a ` (n)` suffix.
+
+    Args:
+        payload (SelectionDownloadRequest): IDs of the selected files and folders, and the format.
+        db (Session): SQLAlchemy session.
+        user_id (int): Authenticated user ID.
+
+    Raises:
+        HTTPException 400: If the selection is empty.
+        HTTPException 404: If a selected file or folder does not exist or belongs to another user.
+
+    Returns:
+        StreamingResponse: Streamed archive of the selection.
+    """
+    file_ids = set(payload.file_ids)
+    folder_ids = set(payload.folder_ids)
+    if not file_ids and not folder_ids:
+        raise HTTPException(status_code=400, detail="Nothing selected")
+
+    files = db.query(models.File).filter(
+        models.File.id.in_(file_ids),
+        models.File.owner_id == user_id
+    ).order_by(models.File.filename).all() if file_ids else []
+
+    owned_folders = {folder_id for (folder_id,) in db.query(models.Folder.id).filter(
+        models.Folder.id.in_(folder_ids),
+        models.Folder.owner_id == user_id
+    ).all()} if folder_ids else set()
+
+    missing_files = file_ids - {file.id for file in files}
+    missing_folders = folder_ids - owned_folders
+    if missing_files or missing_folders:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "message": "Some selected items were not found or access denied",
+                "file_ids": sorted(missing_files),
+                "folder_ids": sorted(missing_folders)
+            }
+        )
+
+    # Each file is written once, even when it is also inside a selected folder
+    walked = list(walk_folder_files(db, folder_ids, user_id)) if folder_ids else []
+    walked_ids = {file.id for _, file in walked}
+    selection = [(file.filename, file) for file in files if file.id not in walked_ids] + walked
+    entries = _archive_entries(selection)
+
+    media_type, extension = ARCHIVE_FORMATS[payload.format]
+    body = stream_archive(entries, payload.format)
     return StreamingResponse(
-        zip_stream,
-        media_type="application/zip",
+        body,
+        media_type=media_type,
         headers={
-            "Content-Disposition": f"attachment; filename={root_folder.name}.zip"
-        }
-    )
\ No newline at end of file
+            "Content-Disposition": f"attachment; filename=selection{extension}"
+        },
+        background=BackgroundTask(body.close)
+    )
@@ -1,19 +1,22 @@
-import io
 import uuid
-from datetime import datetime
+from contextlib import nullcontext
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
 from sqlalchemy.orm import Session
 from app.db import models
 from app.db.database import get_db
 from app.auth.jwt import get_current_user_id
-from app.storage import minio_client
-from zipfile import ZipFile
-import os, tempfile
+import os
 from app.schema.folders import FolderDetails, SubFolderInfo
 from app.schema.files import FileInfo
-from typing import Optional
-from app.storage.minio_client import upload_file
-import mimetypes
+from app.schema.uploads import BatchUploadResponse, BatchUploadResult, IngestJobInfo
+from typing import Optional, List
+from app.core.config import settings
+from app.utils.blob_utils import store_object, store_objects, discard_objects
+from app.utils.zip_utils import ingest_zip
+from app.storage import minio_client
+from app.jobs import ingest
+from app.utils.upload_utils import resolve_upload_folder, create_file_record
+from app.utils.folders_utils import adjust_folder_counters
 
 
 router = APIRouter()
@@ -51,46 +54,16 @@ def upload_files(
     Returns:
         dict: File ID, MIME type, size, and folder ID (if any).
     """
-    folder_id_int = None
-    folder = None
-    if folder_id not in (None, "", "null"):
-        try:
-            folder_id_int = int(folder_id)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid folder_id")
-
-        # Check folder ownership
-        folder = db.query(models.Folder).filter(
-            models.Folder.id == folder_id_int,
-            models.Folder.owner_id == user_id
-        ).first()
+    folder = resolve_upload_folder(db, folder_id, user_id)
 
-        if not folder:
-            raise HTTPException(status_code=400, detail="Folder not found or access denied")
-
-    # Upload to MinIO
-    file_id = str(uuid.uuid4())
-    minio_client.upload_file(file.file, file_id)
-
-    # Calculate size of uploaded file
-    file.file.seek(0, io.SEEK_END)  # Move to end
-    size = file.file.tell()
-    file.file.seek(0)  # Reset pointer
+    # Store the content once per SHA-256; duplicates skip the MinIO write
+    blob = store_object(db, file.file)
 
     # Create file DB record
-    db_file = models.File(
-        id=file_id,
-        filename=file.filename,
-        mime_type=file.content_type,
-        size=size,
-        owner_id=user_id,
-        folder_id=folder_id_int
+    file_id = str(uuid.uuid4())
+    db_file = create_file_record(
+        db, file_id, file.filename, file.content_type, blob.size, user_id, folder, blob.sha256
     )
-    db.add(db_file)
-
-    # Update folder's date_modified if applicable
-    if folder:
-        folder.date_modified = datetime.utcnow()
 
     db.commit()
     db.refresh(db_file)
@@ -99,13 +72,140 @@ def upload_files(
 
 
 
+def _upload_source(upload: UploadFile):
+    """
+    Return a reopenable source over an uploaded file's spooled content.
+    """
+    def open_upload():
+        upload.file.seek(0)
+        return nullcontext(upload.file)
+    return open_upload
+
+
+@router.post(
+    "/upload_files/batch",
+    tags=["Upload"],
+    summary="Upload several files into one folder",
+    response_model=BatchUploadResponse,
+    description="Uploads multiple files in a single multipart request and reports the outcome of each file."
+)
+def upload_files_batch(
+    files: List[UploadFile] = File(...),
+    folder_id: Optional[str] = Query(
+        default=None,
+        description="Optional folder ID to associate with the files"
+    ),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+) -> BatchUploadResponse:
+    """
+    Upload a batch of files into the same folder.
+
+    - Folder ownership is checked once for the whole batch.
+    - Files are written to MinIO concurrently (`UPLOAD_CONCURRENCY` at a time).
+    - All file records are inserted in one transaction.
+    - A file that fails to store is reported without affecting the others.
+
+    Args:
+        files (List[UploadFile]): Files to upload.
+        folder_id (Optional[str]): Optional folder ID to place the files into.
+        db (Session): SQLAlchemy session.
+        user_id (int): Authenticated user ID.
+
+    Returns:
+        BatchUploadResponse: Per-file results, in the order the files were sent.
+    """
+    folder = resolve_upload_folder(db, folder_id, user_id)
+
+    stored, written = store_objects(
+        db, [_upload_source(upload) for upload in files], settings.UPLOAD_CONCURRENCY
+    )
+
+    results: List[BatchUploadResult] = []
+    try:
+        db_files = []
+        for upload, result in zip(files, stored):
+            if isinstance(result, Exception):
+                results.append(BatchUploadResult(filename=upload.filename, success=False, error=str(result)))
+                continue
+            db_file = create_file_record(
+                db, str(uuid.uuid4()), upload.filename, upload.content_type,
+                result.size, user_id, folder, result.sha256, update_counters=False
+            )
+            db_files.append(db_file)
+            results.append(BatchUploadResult(filename=upload.filename, success=True))
+
+        # One counter update for the whole batch
+        if folder and db_files:
+            stored_size = sum(db_file.size for db_file in db_files)
+            adjust_folder_counters(
+                db, folder.id, files=len(db_files), total_files=len(db_files), total_size=stored_size
+            )
+
+        db.flush()
+        file_infos = iter([FileInfo.model_validate(db_file) for db_file in db_files])
+        for result in results:
+            if result.success:
+                result.file = next(file_infos)
+
+        db.commit()
+    except Exception as e:
+        # Remove the objects this batch added while their blob rows are still locked
+        discard_objects(written)
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Batch upload failed: {e}")
+
+    uploaded = sum(1 for result in results if result.success)
+    return BatchUploadResponse(
+        folder_id=folder.id if folder else None,
+        uploaded=uploaded,
+        failed=len(results) - uploaded,
+        results=results
+    )
+
+
+
+def _zip_root_details(db: Session, db_root_folder: models.Folder) -> FolderDetails:
+    """
+    Describe the root folder created from an archive, with its files and subfolders.
+    """
+    db.refresh(db_root_folder)
+    subfolder_infos = [
+        SubFolderInfo(
+            id=sf.id,
+            name=sf.name,
+            parent_id=sf.parent_id,
+            created_at=sf.created_at,
+            date_modified=sf.date_modified,
+            item_count=sf.item_count,
+            total_file_count=sf.total_file_count,
+            total_size=sf.total_size
+        )
+        for sf in db_root_folder.subfolders
+    ]
+
+    return FolderDetails(
+        id=db_root_folder.id,
+        name=db_root_folder.name,
+        owner_id=db_root_folder.owner_id,
+        parent_id=db_root_folder.parent_id,
+        created_at=db_root_folder.created_at,
+        date_modified=db_root_folder.date_modified,
+        files=[FileInfo.model_validate(f) for f in db_root_folder.files],
+        subfolders=subfolder_infos,
+        item_count=len(db_root_folder.files) + len(subfolder_infos),
+        total_file_count=db_root_folder.total_file_count,
+        total_size=db_root_folder.total_size
+    )
+
+
 @router.post(
     "/upload_zip_file",
     response_model=FolderDetails,
     tags=["Upload"],
     summary="Upload a ZIP file into an optional folder"
 )
-async def upload_zip_file(
+def upload_zip_file(
     zip_file: UploadFile = File(...),
     folder_id: Optional[int] = Query(
         default=None,
@@ -115,11 +215,15 @@ async def upload_zip_file(
     current_user_id: int = Depends(get_current_user_id)
 ) -> FolderDetails:
     """
-    Uploads a ZIP file and extracts its contents (files and folders) recursively.
+    Uploads a ZIP file and recreates its contents (files and folders) recursively.
     
     - If `folder_id` is provided, the ZIP contents will be uploaded into that folder.
     - The ZIP file structure is preserved, and nested folders/files are created accordingly in the database.
     - All files are uploaded to MinIO and associated metadata is stored in PostgreSQL.
+    - Members are streamed from the archive without extracting it to disk; archives
+      exceeding the configured entry count, uncompressed size or compression ratio are rejected.
+    - Declared as a plain function so FastAPI runs the whole ingest (ZIP reads,
+      MinIO writes, database work) in its threadpool instead of on the event loop.
 
     Args:
         zip_file (UploadFile): The ZIP file to upload.
@@ -142,91 +246,112 @@ async def upload_zip_file(
         if not parent_folder:
             raise HTTPException(status_code=404, detail="Parent folder not found or access denied.")
 
-    with tempfile.TemporaryDirectory() as temp_dir:
-        zip_path = os.path.join(temp_dir, zip_file.filename)
-        with open(zip_path, "wb") as f:
-            f.write(await zip_file.read())
+    # Stream the members straight from the spooled upload into MinIO
+    zip_root_name = os.path.splitext(zip_file.filename)[0]
+    db_root_folder = ingest_zip(db, zip_file.file, zip_root_name, parent_folder, current_user_id)
 
-        with ZipFile(zip_path, "r") as zip_ref:
-            zip_ref.extractall(temp_dir)
+    return _zip_root_details(db, db_root_folder)
 
-        # Create a root folder named after the ZIP
-        zip_root_name = os.path.splitext(zip_file.filename)[0]
-        db_root_folder = models.Folder(
-            name=zip_root_name,
-            owner_id=current_user_id,
-            parent_id=parent_folder.id if parent_folder else None
-        )
-        db.add(db_root_folder)
-        db.commit()
-        db.refresh(db_root_folder)
-
-        def process_entry(abs_path: str, rel_path: str, parent: Optional[models.Folder]):
-            """
-            Recursive function to process a file or directory inside the ZIP.
-            """
-            if os.path.isdir(abs_path):
-                new_folder = models.Folder(
-                    name=os.path.basename(abs_path),
-                    owner_id=current_user_id,
-                    parent_id=parent.id if parent else db_root_folder.id
-                )
-                db.add(new_folder)
-                db.commit()
-                db.refresh(new_folder)
-
-                for item in os.listdir(abs_path):
-                    child_abs = os.path.join(abs_path, item)
-                    child_rel = os.path.join(rel_path, item)
-                    process_entry(child_abs, child_rel, new_folder)
-            else:
-                file_id = str(uuid.uuid4())
-                with open(abs_path, "rb") as f:
-                    upload_file(f, file_id)
-
-                size = os.path.getsize(abs_path)
-                mime_type = mimetypes.guess_type(abs_path)[0] or "application/octet-stream"
-
-                db_file = models.File(
-                    id=file_id,
-                    filename=os.path.basename(abs_path),
-                    mime_type=mime_type,
-                    size=size,
-                    owner_id=current_user_id,
-                    folder_id=parent.id if parent else db_root_folder.id
-                )
-                db.add(db_file)
-                db.commit()
-
-        # Traverse all items in the extracted temp_dir (excluding the zip file itself)
-        for item in os.listdir(temp_dir):
-            if item == zip_file.filename:
-                continue
-            item_abs = os.path.join(temp_dir, item)
-            process_entry(item_abs, item, None)
 
-    db.refresh(db_root_folder)
-    subfolder_infos = []
-    for sf in db_root_folder.subfolders:
-        item_count = len(sf.files) + len(sf.subfolders)
-        subfolder_info = SubFolderInfo(
-            id=sf.id,
-            name=sf.name,
-            parent_id=sf.parent_id,
-            created_at=sf.created_at,
-            date_modified=sf.date_modified,
-            item_count=item_count
-        )
-        subfolder_infos.append(subfolder_info)
 
-    return FolderDetails(
-        id=db_root_folder.id,
-        name=db_root_folder.name,
-        owner_id=db_root_folder.owner_id,
-        parent_id=db_root_folder.parent_id,
-        created_at=db_root_folder.created_at,
-        date_modified=db_root_folder.date_modified,
-        files=[FileInfo.model_validate(f) for f in db_root_folder.files],
-        subfolders=subfolder_infos,
-        item_count=len(db_root_folder.files) + len(subfolder_infos)
-    )
\ No newline at end of file
+@router.post(
+    "/upload_zip_file/jobs",
+    response_model=IngestJobInfo,
+    status_code=202,
+    tags=["Upload"],
+    summary="Queue a ZIP file for background ingestion"
+)
+def create_zip_ingest_job(
+    zip_file: UploadFile = File(...),
+    folder_id: Optional[int] = Query(
+        default=None,
+        description="Optional ID of the parent folder to upload the ZIP contents into"
+    ),
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+) -> IngestJobInfo:
+    """
+    Accept a ZIP file and ingest it in the background.
+
+    The archive is staged in MinIO and the request returns immediately with a
+    job ID; a worker then recreates its contents exactly like `/upload_zip_file`.
+    Poll `/upload_zip_file/jobs/{job_id}` for progress and the resulting folder.
+
+    Args:
+        zip_file (UploadFile): The ZIP file to upload.
+        folder_id (Optional[int]): Optional ID of the folder to upload into.
+        db (Session): SQLAlchemy database session.
+        current_user_id (int): ID of the currently authenticated user.
+
+    Returns:
+        IngestJobInfo: The queued job.
+    """
+    if not zip_file.filename.endswith(".zip"):
+        raise HTTPException(status_code=400, detail="Only .zip files are supported.")
+
+    if folder_id is not None:
+        parent_folder = db.query(models.Folder).filter(
+            models.Folder.id == folder_id,
+            models.Folder.owner_id == current_user_id
+        ).first()
+        if not parent_folder:
+            raise HTTPException(status_code=404, detail="Parent folder not found or access denied.")
+
+    job_id = str(uuid.uuid4())
+    archive_object = ingest.ARCHIVE_PREFIX + job_id + ".zip"
+    try:
+        minio_client.upload_file(zip_file.file, archive_object)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    job = models.IngestJob(
+        id=job_id,
+        owner_id=current_user_id,
+        parent_folder_id=folder_id,
+        filename=zip_file.filename,
+        archive_object=archive_object,
+        status="queued"
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    ingest.submit(job.id)
+
+    return IngestJobInfo.model_validate(job)
+
+
+
+@router.get(
+    "/upload_zip_file/jobs/{job_id}",
+    response_model=IngestJobInfo,
+    tags=["Upload"],
+    summary="Get the progress of a ZIP ingestion job"
+)
+def get_zip_ingest_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+) -> IngestJobInfo:
+    """
+    Report the progress of a background ingestion job, including the created
+    folder's details once the job has completed.
+
+    Raises:
+        HTTPException(404): If the job does not exist or belongs to another user.
+    """
+    job = db.query(models.IngestJob).filter(
+        models.IngestJob.id == job_id,
+        models.IngestJob.owner_id == current_user_id
+    ).first()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found or access denied")
+
+    job_info = IngestJobInfo.model_validate(job)
+    if job.status == "completed" and job.root_folder_id is not None:
+        root_folder = db.get(models.Folder, job.root_folder_id)
+        if root_folder:
+            job_info.result = _zip_root_details(db, root_folder)
+
+    return job_info
@@ -0,0 +1,435 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+from app.db import models
+from sqlalchemy.orm import Session
+from app.db.database import get_db
+from app.storage import minio_client
+from app.core.config import settings
+from app.schema.files import FileInfo
+from app.auth.jwt import get_current_user_id
+from fastapi.concurrency import run_in_threadpool
+from fastapi import APIRouter, Depends, HTTPException, Request
+from app.utils.upload_utils import resolve_upload_folder, create_file_record, discard_session_upload
+from minio.datatypes import Part
+from app.schema.uploads import UploadSessionCreate, UploadSessionInfo, UploadChunkInfo, PresignedUploadInfo
+
+
+router = APIRouter()
+
+# S3 rejects multipart parts smaller than 5 MiB (except the last one) and more than 10,000 parts
+MIN_CHUNK_SIZE = 5 * 1024 * 1024
+MAX_CHUNKS = 10000
+# S3 rejects single PUTs larger than 5 GiB
+MAX_SINGLE_PUT_SIZE = 5 * 1024 * 1024 * 1024
+
+
+def _total_chunks(session: models.UploadSession) -> int:
+    if session.chunk_size is None:
+        return 1
+    return -(-session.size // session.chunk_size)
+
+
+def _expected_chunk_size(session: models.UploadSession, index: int) -> int:
+    if session.chunk_size is None:
+        return session.size
+    if index < _total_chunks(session) - 1:
+        return session.chunk_size
+    return session.size - session.chunk_size * index
+
+
+def _get_session(db: Session, session_id: str, user_id: int, allow_expired: bool = False) -> models.UploadSession:
+    upload_session = db.query(models.UploadSession).filter(
+        models.UploadSession.id == session_id,
+        models.UploadSession.owner_id == user_id
+    ).first()
+
+    if not upload_session:
+        raise HTTPException(status_code=404, detail="Upload session not found or access denied")
+    if not allow_expired and upload_session.expires_at <= datetime.utcnow():
+        raise HTTPException(status_code=410, detail="Upload session has expired")
+
+    return upload_session
+
+
+def _session_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=settings.UPLOAD_SESSION_TTL_SECONDS)
+
+
+def _url_expiry(upload_session: models.UploadSession) -> timedelta:
+    # A presigned URL must not outlive its session, or its upload would never be cleaned up
+    remaining = upload_session.expires_at - datetime.utcnow()
+    return max(min(timedelta(seconds=settings.PRESIGNED_URL_EXPIRY_SECONDS), remaining), timedelta(seconds=1))
+
+
+def _require_multipart(upload_session: models.UploadSession) -> None:
+    if upload_session.upload_id is None:
+        raise HTTPException(status_code=400, detail="Session uploads with a single presigned PUT and has no chunks")
+
+
+def _received_chunks(upload_session: models.UploadSession) -> list:
+    """
+    Return the MinIO parts received so far; a presigned single-PUT session has
+    one implicit part once its object exists.
+    """
+    try:
+        if upload_session.upload_id is None:
+            stat = minio_client.stat_file(upload_session.object_name)
+            return [Part(1, stat.etag, size=stat.size)] if stat else []
+        return minio_client.list_parts(upload_session.object_name, upload_session.upload_id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _session_info(upload_session: models.UploadSession, received: List[int]) -> UploadSessionInfo:
+    return UploadSessionInfo(
+        id=upload_session.id,
+        filename=upload_session.filename,
+        mime_type=upload_session.mime_type,
+        size=upload_session.size,
+        chunk_size=upload_session.chunk_size or upload_session.size,
+        total_chunks=_total_chunks(upload_session),
+        folder_id=upload_session.folder_id,
+        created_at=upload_session.created_at,
+        expires_at=upload_session.expires_at,
+        received_chunks=received
+    )
+
+
+@router.post(
+    "/upload_sessions",
+    response_model=UploadSessionInfo,
+    tags=["Upload"],
+    summary="Open a resumable upload session",
+    description="Starts a chunked upload backed by a MinIO multipart upload. "
+                "Chunks can then be sent in any order and retried individually."
+)
+def create_upload_session(
+    payload: UploadSessionCreate,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+) -> UploadSessionInfo:
+    """
+    Open an upload session for a single large file.
+
+    Args:
+        payload (UploadSessionCreate): File name, total size, and optional folder and chunk size.
+        db (Session): SQLAlchemy session.
+        user_id (int): Authenticated user ID.
+
+    Returns:
+        UploadSessionInfo: The new session, with no chunks received yet.
+
+    Raises:
+        HTTPException(400): If the folder or chunk size is invalid.
+    """
+    folder = resolve_upload_folder(db, payload.folder_id, user_id)
+
+    chunk_size = payload.chunk_size or settings.UPLOAD_CHUNK_SIZE
+    if not MIN_CHUNK_SIZE <= chunk_size <= settings.UPLOAD_MAX_CHUNK_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"chunk_size must be between {MIN_CHUNK_SIZE} and {settings.UPLOAD_MAX_CHUNK_SIZE} bytes"
+        )
+    if -(-payload.size // chunk_size) > MAX_CHUNKS:
+        raise HTTPException(status_code=400, detail=f"File would need more than {MAX_CHUNKS} chunks; use a larger chunk_size")
+
+    # The object is named after the file ID it will have once finalized
+    object_name = str(uuid.uuid4())
+    mime_type = payload.mime_type or "application/octet-stream"
+    try:
+        upload_id = minio_client.create_multipart_upload(object_name, mime_type)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    upload_session = models.UploadSession(
+        id=str(uuid.uuid4()),
+        owner_id=user_id,
+        folder_id=folder.id if folder else None,
+        filename=payload.filename,
+        mime_type=mime_type,
+        size=payload.size,
+        chunk_size=chunk_size,
+        object_name=object_name,
+        upload_id=upload_id,
+        expires_at=_session_expiry()
+    )
+    db.add(upload_session)
+    db.commit()
+    db.refresh(upload_session)
+
+    return _session_info(upload_session, [])
+
+
+
+@router.post(
+    "/upload_sessions/presigned",
+    response_model=PresignedUploadInfo,
+    tags=["Upload"],
+    summary="Get a presigned URL to upload a file directly to storage",
+    description="Issues a short-lived presigned PUT URL for a new object. The file content goes "
+                "straight to MinIO; finalize the returned session to record the file."
+)
+def create_presigned_upload(
+    payload: UploadSessionCreate,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+) -> PresignedUploadInfo:
+    """
+    Open an upload session whose content is sent with a single presigned PUT.
+
+    The URL is scoped to one generated object name. `chunk_size` is ignored;
+    use a regular session with presigned chunk URLs for multipart uploads,
+    which files over S3's 5 GiB single-PUT limit require.
+
+    Args:
+        payload (UploadSessionCreate): File name, total size, and optional folder.
+        db (Session): SQLAlchemy session.
+        user_id (int): Authenticated user ID.
+
+    Returns:
+        PresignedUploadInfo: The session ID and the URL to upload to.
+
+    Raises:
+        HTTPException(400): If the folder is invalid or the file is too large for a single PUT.
+    """
+    if payload.size > MAX_SINGLE_PUT_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Files over {MAX_SINGLE_PUT_SIZE} bytes must use a chunked session with presigned chunk URLs"
+        )
+
+    folder = resolve_upload_folder(db, payload.folder_id, user_id)
+
+    upload_session = models.UploadSession(
+        id=str(uuid.uuid4()),
+        owner_id=user_id,
+        folder_id=folder.id if folder else None,
+        filename=payload.filename,
+        mime_type=payload.mime_type or "application/octet-stream",
+        size=payload.size,
+        chunk_size=None,
+        object_name=str(uuid.uuid4()),
+        upload_id=None,
+        expires_at=_session_expiry()
+    )
+    db.add(upload_session)
+    db.commit()
+
+    expires = _url_expiry(upload_session)
+    return PresignedUploadInfo(
+        session_id=upload_session.id,
+        url=minio_client.presigned_put_url(upload_session.object_name, expires),
+        expires_at=datetime.utcnow() + expires
+    )
+
+
+
+@router.get(
+    "/upload_sessions/{session_id}/chunks/{index}/presigned",
+    response_model=PresignedUploadInfo,
+    tags=["Upload"],
+    summary="Get a presigned URL for one chunk of a session",
+    description="Lets the client PUT chunk `index` (zero-based) directly to MinIO instead of through the API."
+)
+def get_presigned_chunk_url(
+    session_id: str,
+    index: int,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+) -> PresignedUploadInfo:
+    """
+    Issue a presigned URL for one part of the session's multipart upload.
+    """
+    upload_session = _get_session(db, session_id, user_id)
+    _require_multipart(upload_session)
+
+    if not 0 <= index < _total_chunks(upload_session):
+        raise HTTPException(status_code=400, detail="Chunk index out of range")
+
+    expires = _url_expiry(upload_session)
+    return PresignedUploadInfo(
+        session_id=upload_session.id,
+        url=minio_client.presigned_part_url(
+            upload_session.object_name, upload_session.upload_id, index + 1, expires
+        ),
+        expires_at=datetime.utcnow() + expires
+    )
+
+
+
+@router.put(
+    "/upload_sessions/{session_id}/chunks/{index}",
+    response_model=UploadChunkInfo,
+    tags=["Upload"],
+    summary="Upload one chunk of a session",
+    description="Stores the raw request body as chunk `index` (zero-based). "
+                "Chunks may be sent in parallel or out of order; re-sending a chunk replaces it."
+)
+async def upload_chunk(
+    session_id: str,
+    index: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+) -> UploadChunkInfo:
+    """
+    Relay one chunk straight into the session's MinIO multipart upload.
+
+    The body is held in memory only up to the session's chunk size and never
+    written to the API server's disk.
+
+    Raises:
+        HTTPException(404): If the session does not exist or belongs to another user.
+        HTTPException(410): If the session has expired.
+        HTTPException(400): If the index is out of range or the body has the wrong size.
+        HTTPException(413): If the body is larger than the expected chunk.
+    """
+    upload_session = await run_in_threadpool(_get_session, db, session_id, user_id)
+    _require_multipart(upload_session)
+
+    if not 0 <= index < _total_chunks(upload_session):
+        raise HTTPException(status_code=400, detail="Chunk index out of range")
+
+    expected = _expected_chunk_size(upload_session, index)
+    data = bytearray()
+    async for piece in request.stream():
+        data.extend(piece)
+        if len(data) > expected:
+            raise HTTPException(status_code=413, detail=f"Chunk {index} must be {expected} bytes")
+    if len(data) != expected:
+        raise HTTPException(status_code=400, detail=f"Chunk {index} must be {expected} bytes, got {len(data)}")
+
+    try:
+        etag = await run_in_threadpool(
+            minio_client.upload_part,
+            upload_session.object_name, upload_session.upload_id, index + 1, bytes(data)
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return UploadChunkInfo(session_id=upload_session.id, index=index, size=expected, etag=etag)
+
+
+
+@router.get(
+    "/upload_sessions/{session_id}",
+    response_model=UploadSessionInfo,
+    tags=["Upload"],
+    summary="Get the state of an upload session",
+    description="Returns the session metadata and which chunks MinIO has already received, so a client can resume."
+)
+def get_upload_session(
+    session_id: str,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+) -> UploadSessionInfo:
+    """
+    Report which chunks of an upload session have arrived.
+    """
+    upload_session = _get_session(db, session_id, user_id)
+    parts = _received_chunks(upload_session)
+
+    return _session_info(upload_session, sorted(part.part_number - 1 for part in parts))
+
+
+
+@router.post(
+    "/upload_sessions/{session_id}/complete",
+    response_model=FileInfo,
+    tags=["Upload"],
+    summary="Finalize an upload session",
+    description="Assembles the received chunks into the final object and records the file, "
+                "exactly like a regular upload."
+)
+def complete_upload_session(
+    session_id: str,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+) -> FileInfo:
+    """
+    Complete the upload and create the file's database record.
+
+    Multipart sessions are assembled from their chunks; presigned single-PUT
+    sessions are verified with a `stat_object` call, whose size and content
+    type are recorded.
+
+    Raises:
+        HTTPException(404): If the session does not exist or belongs to another user.
+        HTTPException(410): If the session has expired.
+        HTTPException(409): If chunks are missing or have the wrong size.
+    """
+    upload_session = _get_session(db, session_id, user_id)
+    parts = _received_chunks(upload_session)
+
+    received = {part.part_number: part for part in parts}
+    missing = [i for i in range(_total_chunks(upload_session)) if i + 1 not in received]
+    if missing:
+        raise HTTPException(status_code=409, detail={"message": "Upload is incomplete", "missing_chunks": missing})
+
+    wrong_size = [
+        number - 1 for number, part in received.items()
+        if part.size is not None and part.size != _expected_chunk_size(upload_session, number - 1)
+    ]
+    if wrong_size:
+        raise HTTPException(status_code=409, detail={"message": "Chunks have the wrong size", "invalid_chunks": wrong_size})
+
+    folder = None
+    if upload_session.folder_id is not None:
+        folder = resolve_upload_folder(db, upload_session.folder_id, user_id)
+
+    mime_type = upload_session.mime_type
+    try:
+        if upload_session.upload_id is None:
+            stat = minio_client.stat_file(upload_session.object_name)
+            mime_type = stat.content_type or mime_type
+            etag = stat.etag
+        else:
+            etag = minio_client.complete_multipart_upload(upload_session.object_name, upload_session.upload_id, parts)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    db_file = create_file_record(
+        db,
+        upload_session.object_name,
+        upload_session.filename,
+        mime_type,
+        upload_session.size,
+        user_id,
+        folder,
+        etag=etag
+    )
+    db.delete(upload_session)
+    db.commit()
+    db.refresh(db_file)
+
+    return db_file
+
+
+
+@router.delete(
+    "/upload_sessions/{session_id}",
+    tags=["Upload"],
+    summary="Abort an upload session",
+    description="Cancels the session and discards every chunk received so far."
+)
+def abort_upload_session(
+    session_id: str,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    """
+    Abort the multipart upload (or remove the presigned upload's object) and
+    delete the session, expired or not.
+    """
+    upload_session = _get_session(db, session_id, user_id, allow_expired=True)
+
+    try:
+        discard_session_upload(upload_session)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"MinIO abort failed: {str(e)}")
+
+    db.delete(upload_session)
+    db.commit()
+
+    return {"message": f"Upload of '{upload_session.filename}' aborted"}
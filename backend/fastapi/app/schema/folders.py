@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional, List
-from app.schema.files import FileInfo
+from app.schema.files import FileInfo, FileInFolder
 
 
 class FolderInfo(BaseModel):
@@ -16,6 +16,8 @@ class FolderInfo(BaseModel):
         None, description="Timestamp when the folder was last modified"
     )
     item_count: int = Field(..., description="Number of immediate files and subfolders")
+    total_file_count: int = Field(0, description="Number of files in the folder and all its subfolders")
+    total_size: int = Field(0, description="Size in bytes of all files in the folder and its subfolders")
 
     class Config:
         from_attributes = True  # Enables ORM mode
@@ -33,10 +35,45 @@ class SubFolderInfo(BaseModel):
         None, description="Timestamp when the subfolder was last modified"
     )
     item_count: int = Field(..., description="Number of immediate files and subfolders in this subfolder")
+    total_file_count: int = Field(0, description="Number of files in the subfolder and all its subfolders")
+    total_size: int = Field(0, description="Size in bytes of all files in the subfolder and its subfolders")
     class Config:
         from_attributes = True
 
 
+class FolderBreadcrumb(BaseModel):
+    """
+    One step of the path from a top-level folder down to a folder.
+    """
+    id: int = Field(..., description="Unique identifier of the folder")
+    name: str = Field(..., description="Name of the folder")
+    parent_id: Optional[int] = Field(None, description="ID of the parent folder, if nested")
+    class Config:
+        from_attributes = True
+
+
+class FolderTreeNode(BaseModel):
+    """
+    A folder in a hierarchy listing, with its subfolders nested under it.
+    """
+    id: int = Field(..., description="Unique identifier of the folder")
+    name: str = Field(..., description="Name of the folder")
+    parent_id: Optional[int] = Field(None, description="ID of the parent folder, if nested")
+    created_at: datetime = Field(..., description="Timestamp when the folder was created")
+    date_modified: Optional[datetime] = Field(
+        None, description="Timestamp when the folder was last modified"
+    )
+    item_count: int = Field(..., description="Number of immediate files and subfolders")
+    total_file_count: int = Field(0, description="Number of files in the folder and all its subfolders")
+    total_size: int = Field(0, description="Size in bytes of all files in the folder and its subfolders")
+    children: List["FolderTreeNode"] = Field(
+        default_factory=list, description="Subfolders, cut off below the requested depth"
+    )
+    files: Optional[List[FileInFolder]] = Field(
+        None, description="Files in the folder, only when requested"
+    )
+
+
 class FolderDetails(BaseModel):
     """
     Complete representation of a folder including its files and subfolders.
@@ -52,5 +89,7 @@ class FolderDetails(BaseModel):
     files: List[FileInfo] = Field(default_factory=list, description="List of files inside the folder")
     subfolders: List[SubFolderInfo] = Field(default_factory=list, description="List of immediate subfolders")
     item_count: int = Field(..., description="Number of direct files and subfolders inside this folder")
+    total_file_count: int = Field(0, description="Number of files in the folder and all its subfolders")
+    total_size: int = Field(0, description="Size in bytes of all files in the folder and its subfolders")
     class Config:
         from_attributes = True
\ No newline at end of file
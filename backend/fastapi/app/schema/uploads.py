@@ -0,0 +1,95 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional, List, Union
+from app.schema.files import FileInfo
+from app.schema.folders import FolderDetails
+
+
+class UploadSessionCreate(BaseModel):
+    """
+    Request schema for opening a resumable upload session.
+    """
+    filename: str = Field(..., min_length=1, description="Name of the file being uploaded")
+    size: int = Field(..., gt=0, description="Total size of the file in bytes")
+    mime_type: Optional[str] = Field(default=None, description="MIME type of the file (e.g., 'video/mp4')")
+    folder_id: Optional[Union[int, str]] = Field(default=None, description="Optional folder ID to place the file into")
+    chunk_size: Optional[int] = Field(
+        default=None,
+        description="Chunk size in bytes; every chunk except the last must be exactly this size"
+    )
+
+
+class UploadSessionInfo(BaseModel):
+    """
+    State of a resumable upload session, including the chunks already received.
+    """
+    id: str = Field(..., description="Unique identifier (UUID) of the upload session")
+    filename: str = Field(..., description="Name of the file being uploaded")
+    mime_type: Optional[str] = Field(None, description="MIME type of the file")
+    size: int = Field(..., description="Total size of the file in bytes")
+    chunk_size: int = Field(..., description="Size of each chunk in bytes (the last chunk may be smaller)")
+    total_chunks: int = Field(..., description="Number of chunks needed to complete the upload")
+    folder_id: Optional[int] = Field(None, description="ID of the target folder, if any")
+    created_at: datetime = Field(..., description="Timestamp when the session was opened")
+    expires_at: datetime = Field(..., description="Timestamp after which the session and its chunks are discarded")
+    received_chunks: List[int] = Field(default_factory=list, description="Zero-based indexes of chunks already stored")
+
+
+class PresignedUploadInfo(BaseModel):
+    """
+    URL a client uses to upload a file straight to object storage.
+    """
+    session_id: str = Field(..., description="ID of the upload session to finalize once the upload is done")
+    url: str = Field(..., description="Presigned URL to send the file content to")
+    method: str = Field(default="PUT", description="HTTP method to use with the URL")
+    expires_at: datetime = Field(..., description="Timestamp after which the URL stops working")
+
+
+class UploadChunkInfo(BaseModel):
+    """
+    Acknowledgement returned after a chunk has been stored.
+    """
+    session_id: str = Field(..., description="ID of the upload session")
+    index: int = Field(..., description="Zero-based index of the stored chunk")
+    size: int = Field(..., description="Size of the stored chunk in bytes")
+    etag: str = Field(..., description="ETag MinIO assigned to the chunk")
+
+
+class BatchUploadResult(BaseModel):
+    """
+    Outcome for a single file of a batch upload.
+    """
+    filename: str = Field(..., description="Name of the uploaded file")
+    success: bool = Field(..., description="Whether the file was stored and recorded")
+    file: Optional[FileInfo] = Field(None, description="Metadata of the stored file, if successful")
+    error: Optional[str] = Field(None, description="Reason the file failed, if unsuccessful")
+
+
+class BatchUploadResponse(BaseModel):
+    """
+    Per-file results of a batch upload into one folder.
+    """
+    folder_id: Optional[int] = Field(None, description="ID of the folder the files were uploaded into")
+    uploaded: int = Field(..., description="Number of files stored successfully")
+    failed: int = Field(..., description="Number of files that could not be stored")
+    results: List[BatchUploadResult] = Field(default_factory=list, description="Results in the order the files were sent")
+
+
+class IngestJobInfo(BaseModel):
+    """
+    Progress and outcome of a background ZIP ingestion job.
+    """
+    id: str = Field(..., description="Unique identifier (UUID) of the job")
+    filename: str = Field(..., description="Name of the uploaded archive")
+    status: str = Field(..., description="One of 'queued', 'running', 'completed' or 'failed'")
+    files_total: int = Field(..., description="Number of files in the archive (known once the job has started)")
+    files_done: int = Field(..., description="Number of files stored so far")
+    bytes_total: int = Field(..., description="Total uncompressed size of the archive in bytes")
+    bytes_done: int = Field(..., description="Uncompressed bytes stored so far")
+    error: Optional[str] = Field(None, description="Reason the job failed, if it did")
+    created_at: datetime = Field(..., description="Timestamp when the archive was accepted")
+    updated_at: datetime = Field(..., description="Timestamp of the last progress update")
+    result: Optional[FolderDetails] = Field(None, description="The folder created from the archive, once completed")
+
+    class Config:
+        from_attributes = True
@@ -1,11 +1,20 @@
 from minio import Minio
 from minio.error import S3Error
+from minio.datatypes import Part
+from minio.deleteobjects import DeleteObject
 from app.core.config import settings
-import io
 from fastapi import HTTPException
 import logging
+from datetime import timedelta
+from urllib.parse import quote
 
 
+# Size of the chunks object bodies are relayed to clients in
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# Maximum number of keys in one multi-object delete request
+DELETE_BATCH_SIZE = 1000
+
 # Initialize the MinIO client
 client = Minio(
     settings.MINIO_ENDPOINT,
@@ -14,6 +23,16 @@ client = Minio(
     secure=False  # Use True if HTTPS is enabled
 )
 
+# Client used only to sign URLs handed out to browsers. Signing happens
+# offline, so the region is fixed to avoid a lookup against the public endpoint.
+presign_client = Minio(
+    settings.MINIO_PUBLIC_ENDPOINT or settings.MINIO_ENDPOINT,
+    access_key=settings.MINIO_ROOT_USER,
+    secret_key=settings.MINIO_ROOT_PASSWORD,
+    secure=settings.MINIO_PUBLIC_SECURE,
+    region=settings.MINIO_REGION
+)
+
 
 def create_bucket():
     """
@@ -27,45 +46,260 @@ def create_bucket():
         raise RuntimeError(f"MinIO bucket creation failed: {e}")
 
 
-def upload_file(file_data, file_name):
+class _CountingReader:
+    """
+    Read-only wrapper around a file-like object that counts the bytes handed
+    out, so the size of a stream of unknown length is known once it is consumed.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = self.raw.read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def upload_file(file_data, file_name) -> int:
     """
-    Upload a file object to MinIO.
+    Stream a file object to MinIO without loading it into memory.
+
+    The object is sent with an unknown length as a multipart upload, so at most
+    one part (`MINIO_PART_SIZE` bytes) of the file is held in memory at a time.
 
     :param file_data: A file-like object (e.g., UploadFile.file)
     :param file_name: Unique file name (usually a UUID or hash)
+    :return: Number of bytes uploaded
     """
+    reader = _CountingReader(file_data)
     try:
-        file_bytes = file_data.read()
-        file_data.seek(0)  # Reset pointer in case needed again
-        file_length = len(file_bytes)
         client.put_object(
             bucket_name=settings.MINIO_BUCKET,
             object_name=file_name,
-            data=io.BytesIO(file_bytes),
-            length=file_length,
-            part_size=10 * 1024 * 1024  # 10 MB chunks
+            data=reader,
+            length=-1,
+            part_size=settings.MINIO_PART_SIZE
         )
     except S3Error as e:
         logging.error(f"Error uploading file: {e}")
         raise RuntimeError(f"File upload failed: {e}")
+    return reader.bytes_read
+
+
+def create_multipart_upload(object_name: str, content_type: str = "application/octet-stream") -> str:
+    """
+    Start a multipart upload for `object_name` and return its upload ID.
+    """
+    try:
+        return client._create_multipart_upload(
+            settings.MINIO_BUCKET, object_name, {"Content-Type": content_type}
+        )
+    except S3Error as e:
+        logging.error(f"Error starting multipart upload for {object_name}: {e}")
+        raise RuntimeError(f"Multipart upload creation failed: {e}")
+
+
+def upload_part(object_name: str, upload_id: str, part_number: int, data: bytes) -> str:
+    """
+    Upload one part of a multipart upload. Parts may arrive in any order and
+    re-sending a part number replaces the earlier copy.
+
+    :return: ETag of the stored part
+    """
+    try:
+        return client._upload_part(
+            settings.MINIO_BUCKET, object_name, data, None, upload_id, part_number
+        )
+    except S3Error as e:
+        logging.error(f"Error uploading part {part_number} of {object_name}: {e}")
+        raise RuntimeError(f"Part upload failed: {e}")
+
+
+def list_parts(object_name: str, upload_id: str) -> list[Part]:
+    """
+    List every part MinIO has received for a multipart upload, following pagination.
+    """
+    parts = []
+    marker = None
+    try:
+        while True:
+            result = client._list_parts(
+                settings.MINIO_BUCKET, object_name, upload_id, part_number_marker=marker
+            )
+            parts.extend(result.parts)
+            if not result.is_truncated:
+                return parts
+            marker = result.next_part_number_marker
+    except S3Error as e:
+        logging.error(f"Error listing parts of {object_name}: {e}")
+        raise RuntimeError(f"Listing parts failed: {e}")
+
+
+def complete_multipart_upload(object_name: str, upload_id: str, parts: list[Part]) -> str:
+    """
+    Assemble the uploaded parts (sorted by part number) into the final object.
+
+    :return: ETag of the assembled object
+    """
+    try:
+        result = client._complete_multipart_upload(
+            settings.MINIO_BUCKET, object_name, upload_id,
+            sorted(parts, key=lambda part: part.part_number)
+        )
+    except S3Error as e:
+        logging.error(f"Error completing multipart upload for {object_name}: {e}")
+        raise RuntimeError(f"Multipart upload completion failed: {e}")
+    return result.etag
+
+
+def abort_multipart_upload(object_name: str, upload_id: str) -> None:
+    """
+    Abort a multipart upload and let MinIO discard the parts received so far.
+    An upload that no longer exists counts as aborted.
+    """
+    try:
+        client._abort_multipart_upload(settings.MINIO_BUCKET, object_name, upload_id)
+    except S3Error as e:
+        if e.code != "NoSuchUpload":
+            raise
+
+
+def presigned_put_url(object_name: str, expires: timedelta) -> str:
+    """
+    Create a URL that lets a client PUT an object directly into MinIO.
+    """
+    return presign_client.presigned_put_object(settings.MINIO_BUCKET, object_name, expires=expires)
+
+
+def presigned_part_url(object_name: str, upload_id: str, part_number: int, expires: timedelta) -> str:
+    """
+    Create a URL that lets a client PUT one part of a multipart upload directly into MinIO.
+    """
+    return presign_client.get_presigned_url(
+        "PUT",
+        settings.MINIO_BUCKET,
+        object_name,
+        expires=expires,
+        extra_query_params={"uploadId": upload_id, "partNumber": str(part_number)}
+    )
+
+
+def presigned_get_url(object_name: str, expires: timedelta, filename: str, content_type: str) -> str:
+    """
+    Create a URL that lets a client GET an object directly from MinIO.
+
+    MinIO answers with the given filename (as an attachment) and content type
+    instead of the object's own metadata.
+    """
+    fallback = filename.encode("ascii", "replace").decode().replace('"', "'")
+    disposition = f'attachment; filename="{fallback}"; filename*=UTF-8\'\'{quote(filename, safe="")}'
+    return presign_client.presigned_get_object(
+        settings.MINIO_BUCKET,
+        object_name,
+        expires=expires,
+        response_headers={
+            "response-content-disposition": disposition,
+            "response-content-type": content_type
+        }
+    )
+
+
+def stat_file(object_name: str):
+    """
+    Fetch an object's metadata (size, content type, etag) without its body.
+
+    :return: The object's stat, or None if it does not exist
+    """
+    try:
+        return client.stat_object(settings.MINIO_BUCKET, object_name)
+    except S3Error as e:
+        if e.code in ("NoSuchKey", "NoSuchObject"):
+            return None
+        logging.error(f"Error reading metadata of {object_name}: {e}")
+        raise RuntimeError(f"Object stat failed: {e}")
 
 
-def download_file(file_id: str):
+def list_objects(prefix: str):
+    """
+    Yield the objects whose names start with `prefix`, across every level,
+    following pagination as they are consumed.
+
+    :return: Iterator of MinIO objects, with `object_name`, `size` and `last_modified`
+    """
+    try:
+        yield from client.list_objects(settings.MINIO_BUCKET, prefix=prefix, recursive=True)
+    except S3Error as e:
+        logging.error(f"Error listing objects under {prefix}: {e}")
+        raise RuntimeError(f"Object listing failed: {e}")
+
+
+def download_file(file_id: str, offset: int = 0, length: int = 0):
     """
     Download a file object from MinIO by its file ID (used as object name).
 
     :param file_id: The UUID or unique object name stored in MinIO
+    :param offset: First byte to return
+    :param length: Number of bytes to return from `offset`; 0 means up to the end
     :return: A file-like object (stream)
     """
     try:
-        return client.get_object(settings.MINIO_BUCKET, file_id)
+        return client.get_object(settings.MINIO_BUCKET, file_id, offset=offset, length=length)
     except S3Error as e:
         logging.error(f"Error downloading file with ID {file_id}: {e}")
         raise HTTPException(status_code=404, detail="File not found in storage")
 
 
+def iter_object(response, chunk_size: int = STREAM_CHUNK_SIZE):
+    """
+    Yield the body of a `get_object` response in fixed-size chunks, closing the
+    response and returning its connection to the pool once done.
+    """
+    try:
+        yield from response.stream(chunk_size)
+    finally:
+        close_object(response)
+
+
+def close_object(response) -> None:
+    """
+    Close a `get_object` response and release its connection. Safe to call more than once.
+
+    Pass this as the background task of a streaming response: it runs after the
+    body has been sent or the client has disconnected, even if iteration never started.
+    """
+    response.close()
+    response.release_conn()
+
+
 def delete_file(file_name: str) -> None:
     """
     Deletes a file from the configured MinIO bucket.
     """
-    client.remove_object(settings.MINIO_BUCKET, file_name)
\ No newline at end of file
+    client.remove_object(settings.MINIO_BUCKET, file_name)
+
+
+def delete_files(file_names: list[str]) -> list[tuple[str, str]]:
+    """
+    Delete many objects with MinIO's multi-object delete, `DELETE_BATCH_SIZE` keys per request.
+
+    :param file_names: Object names to remove
+    :return: `(object name, error)` for every object that could not be removed
+    """
+    failures = []
+    for start in range(0, len(file_names), DELETE_BATCH_SIZE):
+        batch = file_names[start:start + DELETE_BATCH_SIZE]
+        try:
+            # The result is lazy: iterating it is what sends the request
+            errors = list(client.remove_objects(
+                settings.MINIO_BUCKET, [DeleteObject(name) for name in batch]
+            ))
+        except S3Error as e:
+            logging.error(f"Error deleting a batch of {len(batch)} objects: {e}")
+            failures.extend((name, str(e)) for name in batch)
+            continue
+        for error in errors:
+            logging.error(f"Error deleting object {error.name}: {error.code} {error.message}")
+            failures.append((error.name, f"{error.code}: {error.message}"))
+    return failures
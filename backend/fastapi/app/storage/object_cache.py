@@ -0,0 +1,260 @@
+import os
+import atexit
+import shutil
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterator, Optional
+from app.core.config import settings
+from app.storage import minio_client
+
+
+class ObjectReader:
+    """
+    Iterable over an object's content, from the cache or from MinIO.
+
+    Pass `close` as the background task of a streaming response so a MinIO
+    connection opened for it is released even if iteration never started.
+    """
+
+    def __init__(self, chunks: Iterator[bytes], on_close: Optional[Callable[[], None]] = None):
+        self._chunks = chunks
+        self._on_close = on_close
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self._chunks
+
+    def read(self) -> bytes:
+        return b"".join(self._chunks)
+
+    def close(self) -> None:
+        self._chunks.close()
+        if self._on_close:
+            self._on_close()
+
+
+class ObjectCache:
+    """
+    Read-through cache of object bodies in front of MinIO, in two tiers:
+
+    - memory: an LRU of objects up to `memory_max_object` bytes, bounded to `memory_bytes`;
+    - disk: an LRU of files in a private directory for objects up to
+      `disk_max_object` bytes, bounded to `disk_bytes`.
+
+    Entries are keyed by object name and ETag, so a rewritten object is never
+    served stale; `invalidate` drops every version of a deleted object. An
+    object is cached the first time it is read in full, while it is streamed
+    to the caller. Setting a tier's byte budget to 0 disables it.
+    """
+
+    def __init__(
+        self,
+        memory_bytes: int,
+        memory_max_object: int,
+        disk_bytes: int,
+        disk_max_object: int,
+        disk_dir: Optional[str] = None
+    ):
+        self.memory_bytes = memory_bytes
+        self.memory_max_object = memory_max_object if memory_bytes else -1
+        self.disk_bytes = disk_bytes
+        self.disk_max_object = disk_max_object if disk_bytes else -1
+
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+        self._memory_used = 0
+        self._disk: OrderedDict[tuple[str, str], tuple[str, int]] = OrderedDict()
+        self._disk_used = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        self._dir = None
+        if disk_bytes:
+            if disk_dir:
+                os.makedirs(disk_dir, exist_ok=True)
+            # A directory per process: entries are only known to the process that wrote them
+            self._dir = tempfile.mkdtemp(prefix="object-cache-", dir=disk_dir)
+            atexit.register(shutil.rmtree, self._dir, True)
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters and current usage of both tiers.
+        """
+        with self._lock:
+            return {
+                **self._stats,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_used,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_used
+            }
+
+    def read_object(
+        self,
+        object_name: str,
+        etag: Optional[str],
+        size: Optional[int],
+        offset: int = 0,
+        length: int = 0,
+        admit: bool = True
+    ) -> ObjectReader:
+        """
+        Read an object, or `length` bytes of it from `offset` (0 meaning up to the end).
+
+        Cached objects are served from memory or disk. Otherwise the object is
+        fetched from MinIO, and a full read of an object small enough for one
+        of the tiers is copied into it along the way. Objects without a known
+        ETag or size bypass the cache.
+
+        With `admit=False` (archive builds and other one-off scans) cached
+        copies are still served, but nothing is stored and the recency of the
+        entries read is left alone, so a large scan cannot evict hot objects.
+
+        Raises:
+            HTTPException(404): If the object does not exist in MinIO.
+        """
+        key = (object_name, etag)
+        cacheable = etag is not None and size is not None
+
+        if cacheable:
+            with self._lock:
+                data = self._memory.get(key)
+                if data is not None:
+                    if admit:
+                        self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                disk_entry = self._disk.get(key) if data is None else None
+                if disk_entry is not None:
+                    if admit:
+                        self._disk.move_to_end(key)
+                    self._stats["disk_hits"] += 1
+                if data is None and disk_entry is None:
+                    self._stats["misses"] += 1
+
+            end = offset + length if length else None
+            if data is not None:
+                return ObjectReader(_iter_bytes(data[offset:end]))
+            if disk_entry is not None:
+                try:
+                    handle = open(disk_entry[0], "rb")
+                except FileNotFoundError:
+                    self._drop_disk(key)
+                else:
+                    return ObjectReader(_iter_file(handle, offset, length))
+
+        response = minio_client.download_file(object_name, offset, length)
+        full_read = admit and cacheable and offset == 0 and (not length or length >= size)
+        if full_read and size <= self.memory_max_object:
+            chunks = self._fill_memory(key, size, response)
+        elif full_read and size <= self.disk_max_object:
+            chunks = self._fill_disk(key, size, response)
+        else:
+            chunks = minio_client.iter_object(response)
+        return ObjectReader(chunks, lambda: minio_client.close_object(response))
+
+    def invalidate(self, object_name: str) -> None:
+        """
+        Drop every cached version of an object, e.g. once it has been deleted.
+        """
+        with self._lock:
+            for key in [key for key in self._memory if key[0] == object_name]:
+                self._memory_used -= len(self._memory.pop(key))
+            disk_keys = [key for key in self._disk if key[0] == object_name]
+        for key in disk_keys:
+            self._drop_disk(key)
+
+    def _fill_memory(self, key, size: int, response) -> Iterator[bytes]:
+        chunks = []
+        for chunk in minio_client.iter_object(response):
+            chunks.append(chunk)
+            yield chunk
+        data = b"".join(chunks)
+        if len(data) != size:
+            return
+
+        with self._lock:
+            if key in self._memory:
+                return
+            self._memory[key] = data
+            self._memory_used += size
+            while self._memory_used > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_used -= len(evicted)
+                self._stats["evictions"] += 1
+
+    def _fill_disk(self, key, size: int, response) -> Iterator[bytes]:
+        handle = tempfile.NamedTemporaryFile(dir=self._dir, delete=False)
+        written = 0
+        complete = False
+        try:
+            with handle:
+                for chunk in minio_client.iter_object(response):
+                    handle.write(chunk)
+                    written += len(chunk)
+                    yield chunk
+            complete = written == size
+        finally:
+            if not complete:
+                _remove(handle.name)
+        if not complete:
+            return
+
+        evicted = []
+        with self._lock:
+            if key in self._disk:
+                evicted.append(handle.name)
+            else:
+                self._disk[key] = (handle.name, size)
+                self._disk_used += size
+                while self._disk_used > self.disk_bytes:
+                    _, (path, entry_size) = self._disk.popitem(last=False)
+                    self._disk_used -= entry_size
+                    self._stats["evictions"] += 1
+                    evicted.append(path)
+        for path in evicted:
+            _remove(path)
+
+    def _drop_disk(self, key) -> None:
+        with self._lock:
+            entry = self._disk.pop(key, None)
+            if entry is None:
+                return
+            self._disk_used -= entry[1]
+        _remove(entry[0])
+
+
+def _iter_bytes(data: bytes) -> Iterator[bytes]:
+    yield data
+
+
+def _iter_file(handle, offset: int, length: int) -> Iterator[bytes]:
+    # Readers keep working if the entry is evicted meanwhile: the file is only unlinked
+    with handle:
+        handle.seek(offset)
+        remaining = length or None
+        while remaining is None or remaining > 0:
+            chunk = handle.read(minio_client.STREAM_CHUNK_SIZE if remaining is None
+                                else min(remaining, minio_client.STREAM_CHUNK_SIZE))
+            if not chunk:
+                return
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logging.error(f"Failed to remove cached object {path}: {e}")
+
+
+object_cache = ObjectCache(
+    memory_bytes=settings.OBJECT_CACHE_MEMORY_BYTES,
+    memory_max_object=settings.OBJECT_CACHE_MEMORY_MAX_OBJECT,
+    disk_bytes=settings.OBJECT_CACHE_DISK_BYTES,
+    disk_max_object=settings.OBJECT_CACHE_DISK_MAX_OBJECT,
+    disk_dir=settings.OBJECT_CACHE_DIR
+)
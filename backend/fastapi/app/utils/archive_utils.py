@@ -0,0 +1,421 @@
+import io
+import os
+import gzip
+import math
+import logging
+import tarfile
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, NamedTuple, Optional
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED
+import zstandard
+from app.storage.object_cache import object_cache
+from app.core.config import settings
+
+# Buffered archive output is handed to the client once it reaches this size
+FLUSH_SIZE = 256 * 1024
+
+# Export formats with their media type and file extension
+ARCHIVE_FORMATS = {
+    "zip": ("application/zip", ".zip"),
+    "tar.zst": ("application/zstd", ".tar.zst"),
+    "tar.gz": ("application/gzip", ".tar.gz"),
+}
+
+# Formats whose content is already compressed; deflating them again costs CPU for no gain
+COMPRESSED_MIME_PREFIXES = ("video/", "audio/", "image/")
+COMPRESSED_MIME_TYPES = {
+    "application/zip", "application/gzip", "application/x-gzip", "application/x-bzip2",
+    "application/x-xz", "application/zstd", "application/x-7z-compressed",
+    "application/vnd.rar", "application/x-rar-compressed", "application/java-archive",
+    "application/epub+zip", "application/pdf", "application/x-apple-diskimage",
+    "font/woff", "font/woff2",
+}
+# Exceptions to the prefixes above that are uncompressed and deflate well
+UNCOMPRESSED_MEDIA_TYPES = {
+    "image/svg+xml", "image/bmp", "image/x-ms-bmp", "image/tiff", "image/x-icon",
+    "image/vnd.microsoft.icon", "audio/wav", "audio/x-wav", "audio/wave",
+}
+TEXT_MIME_TYPES = {
+    "application/json", "application/xml", "application/javascript", "application/x-javascript",
+    "application/sql", "application/x-sh", "application/x-yaml", "application/yaml",
+    "application/csv", "application/rtf",
+}
+
+# Bytes of an entry inspected when its MIME type is inconclusive, and the
+# entropy (bits per byte, 8 being random data) above which it is stored as is
+ENTROPY_SAMPLE_SIZE = 64 * 1024
+ENTROPY_THRESHOLD = 7.5
+
+
+class ArchiveEntry(NamedTuple):
+    """
+    A stored file to be written into an archive under `path`.
+    """
+    path: str
+    object_name: str
+    size: int
+    mime_type: str
+    modified: datetime
+    etag: Optional[str] = None
+
+
+def unique_path(path: str, used: set[str]) -> str:
+    """
+    Return `path`, or `name (n).ext` if it is already in `used`, and record the result.
+    """
+    candidate = path
+    stem, ext = os.path.splitext(path)
+    counter = 1
+    while candidate in used:
+        candidate = f"{stem} ({counter}){ext}"
+        counter += 1
+    used.add(candidate)
+    return candidate
+
+
+def sample_entropy(sample: bytes) -> float:
+    """
+    Shannon entropy of a byte sample in bits per byte.
+    """
+    if not sample:
+        return 0.0
+    total = len(sample)
+    return -sum(
+        count / total * math.log2(count / total)
+        for count in Counter(sample).values()
+    )
+
+
+def compression_for(mime_type: Optional[str], sample: bytes) -> int:
+    """
+    Choose how an archive entry is compressed.
+
+    Already-compressed formats (most images, audio, video, archives) are
+    stored, text-like types are deflated, and anything else is decided from
+    the entropy of a sample of its first bytes.
+
+    Returns:
+        int: `ZIP_STORED` or `ZIP_DEFLATED`.
+    """
+    mime_type = (mime_type or "").split(";")[0].strip().lower()
+
+    if mime_type.startswith("text/") or mime_type in TEXT_MIME_TYPES or mime_type.endswith(("+xml", "+json")):
+        return ZIP_DEFLATED
+    if mime_type in COMPRESSED_MIME_TYPES or mime_type.endswith("+zip"):
+        return ZIP_STORED
+    if mime_type.startswith(COMPRESSED_MIME_PREFIXES) and mime_type not in UNCOMPRESSED_MEDIA_TYPES:
+        return ZIP_STORED
+
+    if sample_entropy(sample[:ENTROPY_SAMPLE_SIZE]) > ENTROPY_THRESHOLD:
+        return ZIP_STORED
+    return ZIP_DEFLATED
+
+
+class _StreamSink(io.RawIOBase):
+    """
+    Write-only, unseekable buffer that the archive writer fills and the
+    response generator drains. Being unseekable makes `ZipFile` emit data
+    descriptors after each entry instead of seeking back to patch headers.
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._buffered = 0
+        self._offset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._buffered += len(data)
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def pending(self) -> int:
+        return self._buffered
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self._buffered = 0
+        return data
+
+
+def _fetch_object(entry: ArchiveEntry, buffer: bool):
+    """
+    Open an object through the object cache without admitting it, so an
+    archive does not evict the objects being served to other clients; small
+    objects are read completely so their bytes are ready when the writer gets to them.
+    """
+    reader = object_cache.read_object(entry.object_name, entry.etag, entry.size, admit=False)
+    if not buffer:
+        return reader
+    try:
+        return reader.read()
+    finally:
+        reader.close()
+
+
+def prefetch_objects(
+    entries: Iterable[ArchiveEntry],
+    depth: int,
+    byte_budget: int
+) -> Iterator[tuple[ArchiveEntry, Iterable[bytes]]]:
+    """
+    Yield `(entry, chunks)` in order while fetching the next `depth` objects
+    concurrently.
+
+    Objects that fit in the remaining `byte_budget` are buffered in memory
+    ahead of time. Larger ones are only opened ahead, which still hides the
+    request latency, and their bodies are streamed when their turn comes. An
+    entry's reservation is released once the writer moves past it. Objects
+    that cannot be fetched are logged and skipped.
+    """
+    pending: deque = deque()
+    remaining = iter(entries)
+    reserved = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, depth)) as pool:
+        def fill() -> None:
+            nonlocal reserved
+            while len(pending) < max(1, depth):
+                entry = next(remaining, None)
+                if entry is None:
+                    return
+                size = entry.size or 0
+                buffer = reserved + size <= byte_budget
+                if buffer:
+                    reserved += size
+                pending.append((entry, buffer, pool.submit(_fetch_object, entry, buffer)))
+
+        # Reader handed to the consumer, closed here if the consumer goes away mid-object
+        in_flight = None
+        try:
+            fill()
+            while pending:
+                entry, buffered, future = pending.popleft()
+                try:
+                    data = future.result()
+                except Exception as e:
+                    logging.error(f"Error downloading file {entry.path} from MinIO: {e}")
+                    data = None
+
+                if data is not None:
+                    if not buffered:
+                        in_flight = data
+                    yield entry, (data,) if buffered else data
+                    if not buffered:
+                        in_flight = None
+                        data.close()
+
+                if buffered:
+                    reserved -= entry.size or 0
+                fill()
+        finally:
+            # Release the connections of the object being streamed and of
+            # those opened ahead but never consumed, e.g. when the client disconnects
+            if in_flight is not None:
+                _close_reader(in_flight)
+            for _, buffered, future in pending:
+                if future.cancel() or buffered or future.exception():
+                    continue
+                _close_reader(future.result())
+
+
+def _close_reader(reader) -> None:
+    try:
+        reader.close()
+    except Exception as e:
+        logging.error(f"Failed to release a MinIO connection: {e}")
+
+
+def stream_zip(entries: Iterable[ArchiveEntry]) -> Iterator[bytes]:
+    """
+    Generate a ZIP archive of `entries` on the fly.
+
+    Objects are read ahead from MinIO by `prefetch_objects` (configured with
+    `ARCHIVE_PREFETCH_DEPTH` and `ARCHIVE_PREFETCH_BYTES`) and relayed in
+    chunks, so memory stays bounded whatever the archive size. Each entry is
+    stored or deflated according to `compression_for`. Local headers
+    are written up front and sizes follow in data descriptors; ZIP64 records
+    are used for large entries and archives.
+    """
+    sink = _StreamSink()
+    objects = prefetch_objects(entries, settings.ARCHIVE_PREFETCH_DEPTH, settings.ARCHIVE_PREFETCH_BYTES)
+    with ZipFile(sink, mode="w", compression=ZIP_DEFLATED, allowZip64=True) as zipf:
+        for entry, chunks in objects:
+            # Peek at the first chunk to sample the content for the compression policy
+            chunks = iter(chunks)
+            first = next(chunks, b"")
+
+            zip_info = ZipInfo(entry.path, date_time=entry.modified.timetuple()[:6])
+            zip_info.compress_type = compression_for(entry.mime_type, first)
+            # Per-entry level; ZipInfo has no public setter before Python 3.13
+            zip_info._compresslevel = settings.ARCHIVE_DEFLATE_LEVEL
+            # The expected size lets ZipFile decide up front whether the entry needs ZIP64
+            zip_info.file_size = entry.size or 0
+
+            with zipf.open(zip_info, mode="w") as dest:
+                dest.write(first)
+                for chunk in chunks:
+                    dest.write(chunk)
+                    if sink.pending() >= FLUSH_SIZE:
+                        yield sink.drain()
+            yield sink.drain()
+
+    # Closing the archive wrote the central directory
+    yield sink.drain()
+
+
+class _ZstdCompressor:
+    """
+    Zstandard stream compressor; with several threads zstd compresses
+    independent jobs of the input in parallel.
+    """
+
+    def __init__(self, level: int, threads: int):
+        self._compressor = zstandard.ZstdCompressor(level=level, threads=threads).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def close(self) -> None:
+        pass
+
+
+class _ParallelGzipCompressor:
+    """
+    Gzip stream compressor that splits its input into fixed-size blocks and
+    compresses them on a thread pool (zlib releases the GIL). Each block
+    becomes its own gzip member; concatenated members are a valid gzip stream.
+    Output is returned in input order, with at most two blocks per thread in flight.
+    """
+
+    def __init__(self, level: int, threads: int, block_size: int):
+        self._level = level
+        self._block_size = block_size
+        self._max_pending = 2 * threads
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="gzip")
+        self._pending: deque = deque()
+        self._buffer = bytearray()
+        self._members = 0
+
+    def _submit(self, block: bytes) -> None:
+        self._pending.append(self._pool.submit(gzip.compress, block, self._level, mtime=0))
+        self._members += 1
+
+    def _collect(self, wait: bool) -> bytes:
+        output = []
+        while self._pending and (wait or self._pending[0].done() or len(self._pending) > self._max_pending):
+            output.append(self._pending.popleft().result())
+        return b"".join(output)
+
+    def compress(self, data: bytes) -> bytes:
+        self._buffer += data
+        while len(self._buffer) >= self._block_size:
+            self._submit(bytes(self._buffer[:self._block_size]))
+            del self._buffer[:self._block_size]
+        return self._collect(wait=False)
+
+    def flush(self) -> bytes:
+        # An empty input still needs one member to be a valid gzip file
+        if self._buffer or not self._members:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        return self._collect(wait=True)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _compression_threads() -> int:
+    return settings.ARCHIVE_COMPRESSION_THREADS or os.cpu_count() or 1
+
+
+def _iter_tar(entries: Iterable[ArchiveEntry]) -> Iterator[bytes]:
+    """
+    Generate an uncompressed tar archive of `entries`.
+
+    Headers come from `tarfile` (PAX format, so long paths and large sizes are
+    supported) and member data is relayed from the prefetched objects. The size
+    recorded in the database is declared up front; an object that turns out
+    shorter is padded with zeros and a longer one is truncated, so the archive
+    stays readable either way.
+    """
+    objects = prefetch_objects(entries, settings.ARCHIVE_PREFETCH_DEPTH, settings.ARCHIVE_PREFETCH_BYTES)
+    offset = 0
+    for entry, chunks in objects:
+        info = tarfile.TarInfo(entry.path)
+        info.size = entry.size or 0
+        info.mtime = int(entry.modified.replace(tzinfo=timezone.utc).timestamp())
+        info.mode = 0o644
+        header = info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+        yield header
+
+        written = 0
+        for chunk in chunks:
+            chunk = chunk[:info.size - written]
+            written += len(chunk)
+            if chunk:
+                yield chunk
+
+        if written < info.size:
+            logging.error(f"Object for {entry.path} is shorter than recorded; padding the tar member")
+            missing = info.size - written
+            while missing:
+                padding = min(missing, FLUSH_SIZE)
+                yield bytes(padding)
+                missing -= padding
+
+        padding = -info.size % tarfile.BLOCKSIZE
+        yield bytes(padding)
+        offset += len(header) + info.size + padding
+
+    # End-of-archive marker, padded to a whole record
+    end = 2 * tarfile.BLOCKSIZE
+    end += -(offset + end) % tarfile.RECORDSIZE
+    yield bytes(end)
+
+
+def stream_tar(entries: Iterable[ArchiveEntry], archive_format: str) -> Iterator[bytes]:
+    """
+    Generate a compressed tar archive of `entries` on the fly.
+
+    `archive_format` is "tar.zst" or "tar.gz". Compression runs on
+    `ARCHIVE_COMPRESSION_THREADS` threads, so large text-heavy exports are
+    not limited to one core.
+    """
+    threads = _compression_threads()
+    if archive_format == "tar.zst":
+        compressor = _ZstdCompressor(settings.ARCHIVE_ZSTD_LEVEL, threads)
+    elif archive_format == "tar.gz":
+        compressor = _ParallelGzipCompressor(settings.ARCHIVE_GZIP_LEVEL, threads, settings.ARCHIVE_GZIP_BLOCK_SIZE)
+    else:
+        raise ValueError(f"Unsupported archive format: {archive_format}")
+
+    try:
+        for data in _iter_tar(entries):
+            output = compressor.compress(data)
+            if output:
+                yield output
+        yield compressor.flush()
+    finally:
+        compressor.close()
+
+
+def stream_archive(entries: Iterable[ArchiveEntry], archive_format: str) -> Iterator[bytes]:
+    """
+    Generate an archive of `entries` in one of `ARCHIVE_FORMATS`.
+    """
+    if archive_format == "zip":
+        return stream_zip(entries)
+    return stream_tar(entries, archive_format)
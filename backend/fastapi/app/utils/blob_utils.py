@@ -0,0 +1,326 @@
+import hashlib
+import logging
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, ContextManager, NamedTuple, Optional, Union
+from sqlalchemy import Integer, String, column, delete, select, update, values
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+from app.db import models
+from app.storage import minio_client
+
+HASH_CHUNK_SIZE = 1024 * 1024
+UPSERT_BATCH_SIZE = 1000
+
+
+class StoredBlob(NamedTuple):
+    sha256: str
+    size: int
+    created: bool
+
+
+def hash_stream(file_data) -> tuple[str, int]:
+    """
+    Compute the SHA-256 and size of a seekable stream, then rewind it.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: file_data.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+        size += len(chunk)
+    file_data.seek(0)
+    return digest.hexdigest(), size
+
+
+def acquire_blobs(db: Session, blobs: dict[str, tuple[int, int]]) -> set[str]:
+    """
+    Add references to several blobs with one upsert per batch of rows.
+
+    The upsert leaves the rows locked until the caller commits, so a concurrent
+    release cannot remove an object between this call and the commit. Rows are
+    locked in hash order to avoid deadlocks between overlapping batches.
+
+    Args:
+        blobs (dict): Maps each SHA-256 to `(size, number of new references)`.
+
+    Returns:
+        set[str]: Hashes of the blobs that are new and whose objects still have to be written.
+    """
+    created = set()
+    items = sorted(blobs.items())
+    now = datetime.utcnow()
+    for start in range(0, len(items), UPSERT_BATCH_SIZE):
+        batch = items[start:start + UPSERT_BATCH_SIZE]
+        stmt = insert(models.Blob).values([
+            {"sha256": sha256, "size": size, "ref_count": count, "created_at": now}
+            for sha256, (size, count) in batch
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.Blob.sha256],
+            set_={"ref_count": models.Blob.ref_count + stmt.excluded.ref_count}
+        ).returning(models.Blob.sha256, models.Blob.ref_count)
+        for sha256, ref_count in db.execute(stmt):
+            if ref_count == blobs[sha256][1]:
+                created.add(sha256)
+    return created
+
+
+def acquire_blob(db: Session, sha256: str, size: int, count: int = 1) -> bool:
+    """
+    Add `count` references to a blob, creating its row if needed.
+
+    Returns:
+        bool: True if the blob is new and its object still has to be written.
+    """
+    return sha256 in acquire_blobs(db, {sha256: (size, count)})
+
+
+def release_blobs(db: Session, counts: dict[str, int]) -> set[str]:
+    """
+    Drop references to several blobs and delete the rows of those left unused,
+    with a few statements per batch of rows.
+
+    The file rows holding the references must already be deleted (and
+    flushed), as the blob rows are removed right away. Rows are locked in hash
+    order, like `acquire_blobs`, to avoid deadlocks between overlapping batches.
+
+    Args:
+        counts (dict): Maps each SHA-256 to the number of references dropped.
+
+    Returns:
+        set[str]: Hashes of the blobs that are gone and whose MinIO objects should be removed.
+    """
+    Blob = models.Blob
+    gone = set()
+    hashes = sorted(counts)
+    for start in range(0, len(hashes), UPSERT_BATCH_SIZE):
+        batch = hashes[start:start + UPSERT_BATCH_SIZE]
+        db.execute(
+            select(Blob.sha256).where(Blob.sha256.in_(batch)).order_by(Blob.sha256).with_for_update()
+        )
+        decrements = values(
+            column("sha256", String), column("count", Integer), name="decrements"
+        ).data([(sha256, counts[sha256]) for sha256 in batch])
+        released = db.execute(
+            update(Blob)
+            .where(Blob.sha256 == decrements.c.sha256)
+            .values(ref_count=Blob.ref_count - decrements.c.count)
+            .returning(Blob.sha256, Blob.ref_count)
+            .execution_options(synchronize_session=False)
+        ).all()
+        unused = [sha256 for sha256, ref_count in released if ref_count <= 0]
+        if unused:
+            db.execute(
+                delete(Blob).where(Blob.sha256.in_(unused)).execution_options(synchronize_session=False)
+            )
+            gone.update(unused)
+    return gone
+
+
+def release_blob(db: Session, sha256: str, count: int = 1) -> bool:
+    """
+    Drop `count` references to a blob and delete its row once none are left.
+
+    Returns:
+        bool: True if the blob is gone and its MinIO object should be removed.
+    """
+    return sha256 in release_blobs(db, {sha256: count})
+
+
+def existing_blobs(db: Session, hashes) -> set[str]:
+    """
+    Return which of the given blobs currently have a row, without locking anything.
+    """
+    hashes = list(hashes)
+    found = set()
+    for start in range(0, len(hashes), UPSERT_BATCH_SIZE):
+        found.update(db.execute(
+            select(models.Blob.sha256).where(models.Blob.sha256.in_(hashes[start:start + UPSERT_BATCH_SIZE]))
+        ).scalars())
+    return found
+
+
+def _ensure_object(open_source, object_name: str, uploaded: bool) -> None:
+    """
+    Make sure a blob whose reference was just created has its object.
+
+    Call with the blob row locked. A blob that existed when it was checked
+    may have been released since, and an object uploaded before the row was
+    taken may have been removed by a concurrent release of the same content;
+    either way it is (re)written now that no release can interfere.
+    """
+    if uploaded and minio_client.stat_file(object_name) is not None:
+        return
+    _upload_source(open_source, object_name)
+
+
+def store_object(db: Session, file_data) -> StoredBlob:
+    """
+    Store the content of a seekable stream as a content-addressed blob.
+
+    The local (spooled) copy is hashed first, so a duplicate only gains a
+    reference and the MinIO write is skipped entirely. New content is written
+    under its content address before the reference is taken, so the blob row
+    is only locked from here until the caller commits, not during the upload.
+    """
+    sha256, size = hash_stream(file_data)
+    object_name = models.BLOB_PREFIX + sha256
+
+    uploaded = sha256 not in existing_blobs(db, [sha256])
+    if uploaded:
+        minio_client.upload_file(file_data, object_name)
+
+    created = acquire_blob(db, sha256, size)
+    if created:
+        def open_stream():
+            file_data.seek(0)
+            return nullcontext(file_data)
+        _ensure_object(open_stream, object_name, uploaded)
+    return StoredBlob(sha256, size, created)
+
+
+def release_file_object(db: Session, db_file: models.File) -> Optional[str]:
+    """
+    Drop the reference a file row holds on its stored object. Delete and
+    flush the file row first: the blob row goes away with its last reference.
+
+    Returns:
+        str | None: Name of the MinIO object to remove, or None while other files still use it.
+    """
+    if db_file.blob_sha256 is None:
+        return db_file.object_name
+    if release_blob(db, db_file.blob_sha256):
+        return db_file.object_name
+    return None
+
+
+def _hash_source(open_source) -> tuple[str, int]:
+    with open_source() as file_data:
+        return hash_stream(file_data)
+
+
+def _upload_source(open_source, object_name: str) -> int:
+    with open_source() as file_data:
+        return minio_client.upload_file(file_data, object_name)
+
+
+def store_objects(
+    db: Session,
+    sources: list[Callable[[], ContextManager]],
+    concurrency: int,
+    on_stored: Optional[Callable[[int], None]] = None
+) -> tuple[list[Union[StoredBlob, Exception]], list[str]]:
+    """
+    Store many streams as content-addressed blobs using a bounded thread pool.
+
+    Every source is hashed in parallel, content without a blob row yet is
+    written to MinIO once, again in parallel, and only then are all
+    references acquired with one bulk upsert. The blob rows are therefore
+    locked from the end of this call until the caller commits, never during
+    the uploads. A source that fails to hash or write is reported in place
+    and holds no reference afterwards. The caller commits.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        sources (list): Callables returning a context manager that yields a
+            seekable stream; each may be opened more than once.
+        concurrency (int): Maximum number of sources read at the same time.
+        on_stored (Optional[Callable]): Called from worker threads with the index
+            of each source as soon as its content is in MinIO.
+
+    Returns:
+        tuple: One `StoredBlob` or exception per source, and the names of the
+            objects of the new blobs, for cleanup should the caller's transaction fail.
+    """
+    hashes: list[Optional[str]] = []
+    results: list[Union[StoredBlob, Exception, None]] = []
+    blobs: dict[str, tuple[int, int]] = {}
+    sources_by_hash: dict[str, list[int]] = {}
+
+    def notify(sha256: str) -> None:
+        if on_stored:
+            for index in sources_by_hash[sha256]:
+                on_stored(index)
+
+    def first_source(sha256: str):
+        return sources[sources_by_hash[sha256][0]]
+
+    failed: dict[str, Exception] = {}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        hash_futures = [pool.submit(_hash_source, source) for source in sources]
+        for index, future in enumerate(hash_futures):
+            error = future.exception()
+            if error:
+                hashes.append(None)
+                results.append(error)
+                continue
+            sha256, size = future.result()
+            hashes.append(sha256)
+            results.append(None)
+            sources_by_hash.setdefault(sha256, []).append(index)
+            blobs[sha256] = (size, blobs.get(sha256, (size, 0))[1] + 1)
+
+        # Write each unknown blob once, from the first source that produced it
+        existing = existing_blobs(db, blobs)
+        upload_futures = {}
+        for sha256 in blobs:
+            if sha256 in existing:
+                continue
+            future = pool.submit(_upload_source, first_source(sha256), models.BLOB_PREFIX + sha256)
+            future.add_done_callback(lambda f, sha256=sha256: f.exception() or notify(sha256))
+            upload_futures[sha256] = future
+        for sha256, future in upload_futures.items():
+            if future.exception():
+                failed[sha256] = future.exception()
+
+        acquired = {sha256: blob for sha256, blob in blobs.items() if sha256 not in failed}
+        created = acquire_blobs(db, acquired) if acquired else set()
+
+        # Now that the rows are locked, fill in objects a concurrent release may have removed
+        ensure_futures = {
+            sha256: pool.submit(
+                _ensure_object, first_source(sha256), models.BLOB_PREFIX + sha256, sha256 in upload_futures
+            )
+            for sha256 in created
+        }
+        for sha256, future in ensure_futures.items():
+            if future.exception():
+                failed[sha256] = future.exception()
+                if release_blob(db, sha256, blobs[sha256][1]):
+                    discard_objects([models.BLOB_PREFIX + sha256])
+            elif sha256 not in upload_futures:
+                notify(sha256)
+
+    for sha256 in existing:
+        if sha256 not in created:
+            notify(sha256)
+
+    written = [models.BLOB_PREFIX + sha256 for sha256 in created if sha256 not in failed]
+    for index, sha256 in enumerate(hashes):
+        if sha256 is None:
+            continue
+        if sha256 in failed:
+            results[index] = failed[sha256]
+        else:
+            results[index] = StoredBlob(sha256, blobs[sha256][0], sha256 in created)
+
+    return results, written
+
+
+def discard_objects(object_names: list[str]) -> None:
+    """
+    Best-effort removal of the objects of blobs a batch created, when the
+    batch is being rolled back.
+
+    Call this before rolling back, while the blob rows are still locked, so a
+    concurrent upload of the same content cannot have its object removed.
+    Objects written before the references were taken are left alone if the
+    batch fails earlier, as another upload may share them; those that stay
+    unreferenced are removed by `jobs.orphan_blobs` after a grace period.
+    """
+    for object_name in object_names:
+        try:
+            minio_client.delete_file(object_name)
+        except Exception as e:
+            logging.error(f"Failed to clean up object {object_name} from MinIO: {e}")
@@ -1,49 +1,466 @@
-from sqlalchemy.orm import Session
+from typing import Iterable, NamedTuple, Optional
+from collections import Counter
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.orm import Session, aliased
 from app.db import models
 from app.storage import minio_client  
+from app.storage.object_cache import object_cache
 from fastapi import HTTPException
 import os, uuid
+import logging
 from datetime import datetime
 from mimetypes import guess_type
-from app.storage.minio_client import upload_file
+from app.utils.blob_utils import store_object, release_blobs
+from app.utils.http_utils import version_etag
 
 
-def delete_folder_recursive(db: Session, folder_id: int, user_id: int):
-    # Get all subfolders of this folder
-    subfolders = db.query(models.Folder).filter(
-        models.Folder.parent_id == folder_id,
-        models.Folder.owner_id == user_id
-    ).all()
+def folder_path(parent_path: Optional[str], folder_id: int) -> str:
+    """
+    Build a folder's materialized path from its parent's path and its own ID.
+    """
+    return f"{parent_path or ''}{folder_id}/"
+
+
+def path_ids(path: str) -> list[int]:
+    """
+    IDs in a materialized path, from the top-level ancestor down to the folder itself.
+    """
+    return [int(part) for part in path.split("/") if part]
+
+
+def in_subtree(path: str):
+    """
+    Condition matching the folder with this path and all its descendants.
+
+    The pattern is a literal prefix, so Postgres answers it from the
+    `text_pattern_ops` index on `folders.path` with one range scan.
+
+    Raises:
+        ValueError: If the path is empty, which would match every folder.
+    """
+    if not path:
+        raise ValueError("Folder has no materialized path")
+    return models.Folder.path.like(path + "%")
+
+
+def set_folder_path(db: Session, folder: models.Folder, parent: Optional[models.Folder]) -> None:
+    """
+    Give a newly added folder its materialized path, flushing it first if it
+    has no ID yet. Nothing is committed.
+    """
+    if folder.id is None:
+        db.flush()
+    folder.path = folder_path(parent.path if parent else None, folder.id)
+
+
+def folder_ancestors(db: Session, folder: models.Folder) -> list[models.Folder]:
+    """
+    Load a folder's ancestors, from the top-level folder down to its parent,
+    with one primary-key lookup.
+    """
+    ancestor_ids = path_ids(folder.path)[:-1]
+    if not ancestor_ids:
+        return []
+    ancestors = db.query(models.Folder).filter(models.Folder.id.in_(ancestor_ids)).all()
+    return sorted(ancestors, key=lambda ancestor: len(ancestor.path))
+
+
+class FolderDeletion(NamedTuple):
+    """
+    Outcome of `delete_folder_recursive`.
+    """
+    file_count: int
+    total_size: int
+    failed_objects: list[tuple[str, str]]
+
+
+def delete_folder_recursive(db: Session, folder_id: int, user_id: int) -> FolderDeletion:
+    """
+    Delete a folder with all its subfolders, files, favorites and pending
+    upload sessions, without walking the tree in Python.
+
+    The subtree is collected by one prefix scan of the path index, the rows are removed by a
+    handful of set-based DELETEs, blob references are released in batches,
+    and the objects left unused are removed through MinIO's multi-object
+    delete. Objects are removed before the caller commits, while their blob
+    rows are still locked; counters of the folder's ancestors are left to the caller.
+
+    Returns:
+        FolderDeletion: Number and total size of the deleted files, and
+            `(object name, error)` for each object MinIO failed to remove
+            (their rows are deleted regardless). A multipart upload that
+            could not be aborted is reported under its object name.
+    """
+    Folder, File, Favorite = models.Folder, models.File, models.Favorite
+    UploadSession = models.UploadSession
 
-    # Recursively delete all subfolders
-    for subfolder in subfolders:
-        delete_folder_recursive(db, subfolder.id, user_id)
+    path = db.execute(
+        select(Folder.path).where(Folder.id == folder_id, Folder.owner_id == user_id)
+    ).scalar()
+    if path is None:
+        return FolderDeletion(0, 0, [])
+    folder_ids = db.execute(
+        select(Folder.id).where(in_subtree(path), Folder.owner_id == user_id)
+    ).scalars().all()
 
-    # Delete all files inside this folder
-    files = db.query(models.File).filter(
-        models.File.folder_id == folder_id,
-        models.File.owner_id == user_id
+    files = db.execute(
+        select(File.id, File.blob_sha256, File.size).where(File.folder_id.in_(folder_ids))
+    ).all()
+    files_in_subtree = select(File.id).where(File.folder_id.in_(folder_ids))
+    # Locked so the expiry sweeper skips them instead of discarding them a second time
+    upload_sessions = db.execute(
+        select(UploadSession.id, UploadSession.object_name, UploadSession.upload_id)
+        .where(UploadSession.folder_id.in_(folder_ids)).with_for_update()
     ).all()
 
-    for file in files:
-        # Delete from MinIO storage
+    db.execute(
+        delete(Favorite).where(or_(
+            Favorite.folder_id.in_(folder_ids),
+            Favorite.file_id.in_(files_in_subtree)
+        )).execution_options(synchronize_session=False)
+    )
+    db.execute(
+        delete(File).where(File.folder_id.in_(folder_ids)).execution_options(synchronize_session=False)
+    )
+    db.execute(
+        delete(UploadSession).where(UploadSession.folder_id.in_(folder_ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        delete(Folder).where(Folder.id.in_(folder_ids)).execution_options(synchronize_session=False)
+    )
+
+    # Objects stored before deduplication belong to their file alone
+    object_names = [file.id for file in files if file.blob_sha256 is None]
+    released = Counter(file.blob_sha256 for file in files if file.blob_sha256 is not None)
+    object_names += [models.BLOB_PREFIX + sha256 for sha256 in release_blobs(db, released)]
+
+    for object_name in object_names:
+        object_cache.invalidate(object_name)
+    # Uploads still in flight: single-PUT objects go with the others, multipart uploads are aborted
+    object_names += [session.object_name for session in upload_sessions if session.upload_id is None]
+    failed_objects = minio_client.delete_files(object_names)
+    for session in upload_sessions:
+        if session.upload_id is None:
+            continue
         try:
-            minio_client.delete_file(file.id)
+            minio_client.abort_multipart_upload(session.object_name, session.upload_id)
         except Exception as e:
-            # Optionally log the error but continue with deletion
-            print(f"Failed to delete file {file.id} from MinIO: {e}")
+            logging.error(f"Failed to abort upload of session {session.id}: {e}")
+            failed_objects.append((session.object_name, str(e)))
+
+    return FolderDeletion(len(files), sum(file.size or 0 for file in files), failed_objects)
+
+
+def adjust_folder_counters(
+    db: Session,
+    folder_id: Optional[int],
+    files: int = 0,
+    subfolders: int = 0,
+    total_files: int = 0,
+    total_size: int = 0
+) -> None:
+    """
+    Apply a change of contents to a folder's denormalized counters, in the
+    caller's transaction.
+
+    `files` and `subfolders` change the folder's direct counts; `total_files`
+    and `total_size` change the recursive totals of the folder and of every
+    ancestor. Pass negative values for removals. The updates are atomic
+    increments, so concurrent writers do not lose each other's changes; ORM
+    instances already loaded keep their old values until refreshed.
+
+    Args:
+        folder_id (Optional[int]): Folder whose contents changed; None (the root level) is a no-op.
+    """
+    if folder_id is None:
+        return
+    Folder = models.Folder
+
+    if files or subfolders:
+        db.execute(
+            update(Folder)
+            .where(Folder.id == folder_id)
+            .values(
+                file_count=Folder.file_count + files,
+                subfolder_count=Folder.subfolder_count + subfolders
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    if total_files or total_size:
+        # The folder and its ancestors are the IDs in its path
+        path = db.execute(select(Folder.path).where(Folder.id == folder_id)).scalar()
+        if path is None:
+            return
+        db.execute(
+            update(Folder)
+            .where(Folder.id.in_(path_ids(path)))
+            .values(
+                total_file_count=Folder.total_file_count + total_files,
+                total_size=Folder.total_size + total_size
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+
+def recompute_folder_counters(db: Session, root_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute the denormalized counters from the `files` and `folders` tables.
+
+    Only the given folders and everything below them are recomputed, or every
+    folder when `root_ids` is None. Totals come from one recursive query over
+    (ancestor, descendant) pairs, so this is meant for repairs and freshly
+    bulk-inserted trees rather than for every write. Materialized paths are
+    trusted, not rebuilt. Nothing is committed.
+
+    Returns:
+        int: Number of folders updated.
+    """
+    Folder, File = models.Folder, models.File
+    Child = aliased(Folder)
+
+    if root_ids is None:
+        scope = select(Folder.id)
+    else:
+        root_paths = db.execute(select(Folder.path).where(Folder.id.in_(list(root_ids)))).scalars().all()
+        if not root_paths:
+            return 0
+        scope = select(Folder.id).where(or_(*(in_subtree(path) for path in root_paths)))
+
+    closure = select(
+        Folder.id.label("ancestor_id"), Folder.id.label("folder_id")
+    ).where(Folder.id.in_(scope)).cte("closure", recursive=True)
+    closure = closure.union_all(
+        select(closure.c.ancestor_id, Folder.id).join(closure, Folder.parent_id == closure.c.folder_id)
+    )
+    totals = (
+        select(
+            closure.c.ancestor_id,
+            func.count(File.id).label("files"),
+            func.coalesce(func.sum(File.size), 0).label("size")
+        )
+        .select_from(closure)
+        .outerjoin(File, File.folder_id == closure.c.folder_id)
+        .group_by(closure.c.ancestor_id)
+        .subquery()
+    )
 
-        # Delete from DB
-        db.delete(file)
+    result = db.execute(
+        update(Folder)
+        .where(Folder.id == totals.c.ancestor_id)
+        .values(
+            file_count=select(func.count(File.id)).where(File.folder_id == Folder.id).scalar_subquery(),
+            subfolder_count=select(func.count(Child.id)).where(Child.parent_id == Folder.id).scalar_subquery(),
+            total_file_count=totals.c.files,
+            total_size=totals.c.size
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def move_folder(db: Session, folder: models.Folder, new_parent: Optional[models.Folder]) -> None:
+    """
+    Move a folder with everything below it under `new_parent` (None for the
+    root level), in the caller's transaction.
+
+    The subtree's paths are rewritten by one UPDATE over the path index; the
+    counters of the old and new parents and of their ancestors are adjusted
+    by the folder's totals. The caller should hold a lock on the folder row.
+
+    Raises:
+        HTTPException(400): If `new_parent` is the folder itself or one of its subfolders.
+    """
+    Folder = models.Folder
+
+    if new_parent is not None and new_parent.path.startswith(folder.path):
+        raise HTTPException(status_code=400, detail="A folder cannot be moved into itself or one of its subfolders")
+
+    new_parent_id = new_parent.id if new_parent else None
+    if new_parent_id == folder.parent_id:
+        return
+
+    old_parent_id = folder.parent_id
+    old_path = folder.path
+    new_path = folder_path(new_parent.path if new_parent else None, folder.id)
+
+    adjust_folder_counters(
+        db, old_parent_id, subfolders=-1,
+        total_files=-folder.total_file_count, total_size=-folder.total_size
+    )
+    adjust_folder_counters(
+        db, new_parent_id, subfolders=1,
+        total_files=folder.total_file_count, total_size=folder.total_size
+    )
+
+    db.execute(
+        update(Folder)
+        .where(in_subtree(old_path))
+        .values(path=new_path + func.substr(Folder.path, len(old_path) + 1))
+        .execution_options(synchronize_session=False)
+    )
+
+    now = datetime.utcnow()
+    db.execute(
+        update(Folder)
+        .where(Folder.id.in_([parent_id for parent_id in (old_parent_id, new_parent_id) if parent_id is not None]))
+        .values(date_modified=now)
+        .execution_options(synchronize_session=False)
+    )
+    folder.parent_id = new_parent_id
+    folder.path = new_path
+    folder.date_modified = now
+
+
+def walk_folder_files(db: Session, folder_ids: Iterable[int], user_id: int):
+    """
+    Yield `(path, file)` for every file in the given folders and their
+    subfolders. Paths start with each folder's name, followed by the names of
+    the folders below it; folders not owned by the user are ignored, and so
+    are folders nested in another given folder, which are covered by it.
+
+    The subtrees are read with one prefix scan of the path index and their
+    files with one more query; names are joined up in Python.
+    """
+    Folder, File = models.Folder, models.File
+
+    roots = db.execute(
+        select(Folder.id, Folder.path).where(Folder.id.in_(list(folder_ids)), Folder.owner_id == user_id)
+    ).all()
+    if not roots:
+        return
+
+    # A selected folder inside another selected folder is walked as part of it, under its parent's path
+    selected = {root.id for root in roots}
+    roots = [root for root in roots if selected.isdisjoint(path_ids(root.path)[:-1])]
+
+    folders = db.execute(
+        select(Folder.id, Folder.parent_id, Folder.name, Folder.path)
+        .where(or_(*(in_subtree(root.path) for root in roots)), Folder.owner_id == user_id)
+        .order_by(func.length(Folder.path))
+    ).all()
+
+    # Parents sort before their children, so every parent's name path is known first
+    root_ids = {root.id for root in roots}
+    names: dict[int, str] = {}
+    for folder in folders:
+        if folder.id in root_ids or folder.parent_id not in names:
+            names[folder.id] = folder.name
+        else:
+            names[folder.id] = f"{names[folder.parent_id]}/{folder.name}"
+
+    rows = db.execute(
+        select(File).where(File.folder_id.in_(list(names)), File.owner_id == user_id)
+    ).scalars().all()
+
+    entries = sorted(((names[file.folder_id], file) for file in rows), key=lambda entry: (entry[0], entry[1].filename))
+    for path, file in entries:
+        yield f"{path}/{file.filename}", file
+
+
+def _isoformat(moment: Optional[datetime]) -> Optional[str]:
+    return moment.isoformat() if moment is not None else None
+
+
+def folder_tree(
+    db: Session,
+    user_id: int,
+    root_id: Optional[int] = None,
+    depth: Optional[int] = None,
+    include_files: bool = False
+) -> list[dict]:
+    """
+    Build a user's folder hierarchy as nested, JSON-ready dicts.
+
+    The folders come from one query: all of the user's folders, or the
+    subtree of `root_id` through the path index, cut at `depth` levels below
+    the top (0 keeps only the top). Files, when asked for, come from one more
+    query over the same folders. Rows are read as plain tuples and linked up
+    by ID in Python, so the cost stays linear in the number of folders.
+
+    Args:
+        root_id (Optional[int]): Folder to start from; None for all top-level folders.
+        depth (Optional[int]): Levels to include below the top; None for no limit.
+        include_files (bool): Whether to list each folder's files.
+
+    Returns:
+        list: The top-level nodes (just `root_id` when given), children and files sorted by name.
+
+    Raises:
+        HTTPException(404): If `root_id` does not exist or is not owned by the user.
+    """
+    Folder, File = models.Folder, models.File
+
+    conditions = [Folder.owner_id == user_id]
+    top_level = 1
+    if root_id is not None:
+        root_path = db.execute(
+            select(Folder.path).where(Folder.id == root_id, Folder.owner_id == user_id)
+        ).scalar()
+        if root_path is None:
+            raise HTTPException(status_code=404, detail="Folder not found")
+        conditions.append(in_subtree(root_path))
+        top_level = len(path_ids(root_path))
+    if depth is not None:
+        # A folder's level is the number of IDs in its path
+        level = func.length(Folder.path) - func.length(func.replace(Folder.path, "/", ""))
+        conditions.append(level <= top_level + depth)
+
+    rows = db.execute(
+        select(
+            Folder.id, Folder.parent_id, Folder.name, Folder.created_at, Folder.date_modified,
+            Folder.file_count, Folder.subfolder_count, Folder.total_file_count, Folder.total_size
+        )
+        .where(*conditions)
+        .order_by(Folder.name, Folder.id)
+    ).all()
+
+    nodes: dict[int, dict] = {}
+    for row in rows:
+        node = {
+            "id": row.id,
+            "name": row.name,
+            "parent_id": row.parent_id,
+            "created_at": _isoformat(row.created_at),
+            "date_modified": _isoformat(row.date_modified),
+            "item_count": row.file_count + row.subfolder_count,
+            "total_file_count": row.total_file_count,
+            "total_size": row.total_size,
+            "children": []
+        }
+        if include_files:
+            node["files"] = []
+        nodes[row.id] = node
+
+    # Rows are in name order, so every children list ends up sorted
+    roots = []
+    for row in rows:
+        parent = nodes.get(row.parent_id)
+        (parent["children"] if parent is not None else roots).append(nodes[row.id])
+
+    if include_files and nodes:
+        files = db.execute(
+            select(
+                File.id, File.folder_id, File.filename, File.upload_time,
+                File.mime_type, File.size, File.date_modified
+            )
+            .join(Folder, File.folder_id == Folder.id)
+            .where(*conditions, File.owner_id == user_id)
+            .order_by(File.filename, File.id)
+        ).all()
+        for file in files:
+            nodes[file.folder_id]["files"].append({
+                "id": file.id,
+                "filename": file.filename,
+                "upload_time": _isoformat(file.upload_time),
+                "mime_type": file.mime_type,
+                "size": file.size,
+                "date_modified": _isoformat(file.date_modified)
+            })
+
+    return roots
 
-    # Delete this folder itself
-    folder = db.query(models.Folder).filter(
-        models.Folder.id == folder_id,
-        models.Folder.owner_id == user_id
-    ).first()
-    if folder:
-        db.delete(folder)
-        
 
 def create_folder_recursive(
     base_path: str,
@@ -65,6 +482,8 @@ def create_folder_recursive(
         date_modified=None
     )
     db.add(folder)
+    set_folder_path(db, folder, parent_folder)
+    adjust_folder_counters(db, folder.parent_id, subfolders=1)
     db.commit()
     db.refresh(folder)
 
@@ -75,27 +494,64 @@ def create_folder_recursive(
         if os.path.isdir(entry_path):
             create_folder_recursive(base_path, entry_rel_path, folder, db, owner_id)
         else:
-            file_id = str(uuid.uuid4())
             with open(entry_path, "rb") as f:
                 try:
-                    upload_file(f, file_id)
+                    blob = store_object(db, f)
                 except Exception as e:
                     raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
 
-            file_size = os.path.getsize(entry_path)
             mime_type = guess_type(entry_path)[0] or "application/octet-stream"
 
             db_file = models.File(
-                id=file_id,
+                id=str(uuid.uuid4()),
                 filename=entry,
                 mime_type=mime_type,
-                size=file_size,
+                size=blob.size,
+                blob_sha256=blob.sha256,
+                etag=blob.sha256,
                 owner_id=owner_id,
                 folder_id=folder.id,
                 upload_time=datetime.utcnow(),
                 date_modified=None
             )
             db.add(db_file)
+            adjust_folder_counters(db, folder.id, files=1, total_files=1, total_size=blob.size)
 
     db.commit()
-    return folder
\ No newline at end of file
+    return folder
+
+
+def folder_version(db: Session, folder: models.Folder, user_id: int) -> str:
+    """
+    Compute the ETag of a folder's details listing with one aggregate query.
+
+    The ETag covers the folder itself with its counters, the total size and
+    latest change of its files, and the latest change and counters of its
+    subfolders. There is no matching last-modified time: changes deeper down
+    only show in the recursive totals, not in any timestamp.
+
+    Returns:
+        str: The strong ETag.
+    """
+    File, Folder = models.File, models.Folder
+
+    file_modified = func.coalesce(File.date_modified, File.upload_time)
+    folder_modified = func.coalesce(Folder.date_modified, Folder.created_at)
+    in_folder = (File.folder_id == folder.id, File.owner_id == user_id)
+    subfolders = (Folder.parent_id == folder.id, Folder.owner_id == user_id)
+
+    stats = db.execute(select(
+        select(func.coalesce(func.sum(File.size), 0)).where(*in_folder).scalar_subquery(),
+        select(func.max(file_modified)).where(*in_folder).scalar_subquery(),
+        select(func.max(folder_modified)).where(*subfolders).scalar_subquery(),
+        select(func.coalesce(func.sum(Folder.file_count + Folder.subfolder_count), 0))
+            .where(*subfolders).scalar_subquery(),
+        select(func.coalesce(func.sum(Folder.total_file_count), 0)).where(*subfolders).scalar_subquery(),
+        select(func.coalesce(func.sum(Folder.total_size), 0)).where(*subfolders).scalar_subquery(),
+    )).one()
+
+    return version_etag(
+        folder.id, folder.name, folder.parent_id, folder.date_modified,
+        folder.file_count, folder.subfolder_count, folder.total_file_count, folder.total_size,
+        *stats
+    )
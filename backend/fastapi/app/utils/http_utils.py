@@ -0,0 +1,143 @@
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import HTTPException, Request, Response
+
+# Refuse pathological Range headers asking for a huge number of pieces
+MAX_RANGES = 32
+
+
+def parse_range_header(header: str, size: int) -> Optional[list[tuple[int, int]]]:
+    """
+    Parse a `Range: bytes=...` header into inclusive `(start, end)` byte ranges.
+
+    Supports explicit (`0-499`), open-ended (`500-`) and suffix (`-500`) ranges,
+    comma separated. Ranges starting past the end of the content are dropped,
+    and the others are clamped to the content size.
+
+    Returns:
+        list | None: The satisfiable ranges, or None if the header is malformed
+            or uses another unit, in which case it must be ignored.
+
+    Raises:
+        HTTPException(416): If no requested range overlaps the content.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+
+    pieces = spec.split(",")
+    if len(pieces) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for piece in pieces:
+        first, dash, last = piece.strip().partition("-")
+        if not dash:
+            return None
+        try:
+            if first == "":
+                suffix = int(last)
+                if suffix <= 0:
+                    continue
+                start, end = max(size - suffix, 0), size - 1
+            else:
+                start = int(first)
+                if last:
+                    end = int(last)
+                    if end < start:
+                        return None
+                else:
+                    # Open-ended: a start past the end is unsatisfiable, not malformed
+                    end = size - 1
+                end = min(end, size - 1)
+        except ValueError:
+            return None
+        if start < size:
+            ranges.append((start, end))
+
+    if not ranges:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return ranges
+
+
+def if_range_matches(if_range: str, etag: str, last_modified) -> bool:
+    """
+    Evaluate an `If-Range` header: a strong ETag must match exactly, and an
+    HTTP date must equal the resource's last-modified time to the second.
+    """
+    if_range = if_range.strip()
+    if if_range.startswith('"'):
+        return if_range == '"' + etag.strip('"') + '"'
+    if if_range.startswith("W/"):
+        return False
+    try:
+        return parsedate_to_datetime(if_range) == _as_utc(last_modified).replace(microsecond=0)
+    except (TypeError, ValueError):
+        return False
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # Timestamps in the database are naive UTC
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def quote_etag(etag: str) -> str:
+    """
+    Format a validator as a strong entity tag (`"..."`).
+    """
+    return '"' + etag.strip('"') + '"'
+
+
+def version_etag(*parts) -> str:
+    """
+    Derive a strong entity tag from the values a representation depends on,
+    e.g. counts and latest modification times from an aggregate query.
+    """
+    return quote_etag(hashlib.sha256(repr(parts).encode()).hexdigest()[:32])
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    """
+    `ETag` and, when known, `Last-Modified` headers for a response.
+    """
+    headers = {"ETag": quote_etag(etag)}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified).replace(microsecond=0), usegmt=True)
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    Evaluate `If-None-Match` / `If-Modified-Since` for a GET request.
+
+    `If-None-Match` takes precedence and uses weak comparison, so `W/` tags
+    and `*` match too; `If-Modified-Since` is only considered without it,
+    and only when the resource has a `last_modified` time.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or any(
+            tag.removeprefix("W/") == quote_etag(etag) for tag in tags
+        )
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return _as_utc(last_modified).replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """
+    Empty `304 Not Modified` response carrying the current validators.
+    """
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
@@ -0,0 +1,97 @@
+from sqlalchemy.orm import Session
+from app.db import models
+from fastapi import HTTPException
+from datetime import datetime
+from typing import Optional, Union
+from app.utils.folders_utils import adjust_folder_counters
+from app.storage import minio_client
+
+
+def resolve_upload_folder(
+    db: Session,
+    folder_id: Optional[Union[int, str]],
+    user_id: int
+) -> Optional[models.Folder]:
+    """
+    Parse an optional `folder_id` coming from an upload request and verify
+    that the folder belongs to the user.
+
+    Returns:
+        Folder | None: The target folder, or None for the root level.
+
+    Raises:
+        HTTPException(400): If the ID is malformed or the folder is not owned by the user.
+    """
+    if folder_id in (None, "", "null"):
+        return None
+
+    try:
+        folder_id_int = int(folder_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid folder_id")
+
+    folder = db.query(models.Folder).filter(
+        models.Folder.id == folder_id_int,
+        models.Folder.owner_id == user_id
+    ).first()
+
+    if not folder:
+        raise HTTPException(status_code=400, detail="Folder not found or access denied")
+
+    return folder
+
+
+def create_file_record(
+    db: Session,
+    file_id: str,
+    filename: str,
+    mime_type: Optional[str],
+    size: int,
+    user_id: int,
+    folder: Optional[models.Folder],
+    blob_sha256: Optional[str] = None,
+    etag: Optional[str] = None,
+    update_counters: bool = True
+) -> models.File:
+    """
+    Add the `File` row for an object that has landed in MinIO and bump the
+    parent folder's `date_modified`. The caller commits.
+
+    Files stored through deduplication pass the `blob_sha256` they reference,
+    which also serves as their ETag; otherwise the object is expected under
+    `file_id` and its MinIO `etag` should be given.
+
+    The folder's counters are updated too, unless `update_counters` is False
+    because the caller accounts for several files at once.
+    """
+    db_file = models.File(
+        id=file_id,
+        filename=filename,
+        mime_type=mime_type or "application/octet-stream",
+        size=size,
+        owner_id=user_id,
+        folder_id=folder.id if folder else None,
+        blob_sha256=blob_sha256,
+        etag=etag or blob_sha256
+    )
+    db.add(db_file)
+
+    # Update folder's date_modified and counters if applicable
+    if folder:
+        folder.date_modified = datetime.utcnow()
+        if update_counters:
+            adjust_folder_counters(db, folder.id, files=1, total_files=1, total_size=size)
+
+    return db_file
+
+
+def discard_session_upload(upload_session: models.UploadSession) -> None:
+    """
+    Throw away what a client sent for an upload session: abort its multipart
+    upload, or remove the object of a presigned single-PUT session.
+    The session row is left to the caller.
+    """
+    if upload_session.upload_id is None:
+        minio_client.delete_file(upload_session.object_name)
+    else:
+        minio_client.abort_multipart_upload(upload_session.object_name, upload_session.upload_id)
@@ -0,0 +1,249 @@
+import mimetypes
+import threading
+import uuid
+from datetime import datetime
+from typing import Callable, Optional
+from zipfile import ZipFile, ZipInfo, BadZipFile
+from fastapi import HTTPException
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from app.db import models
+from app.core.config import settings
+from app.utils.blob_utils import store_objects, discard_objects
+from app.utils.folders_utils import adjust_folder_counters, recompute_folder_counters, folder_path
+
+# Entries smaller than this are never rejected for their compression ratio;
+# tiny files of repeated bytes compress extremely well without being dangerous.
+RATIO_CHECK_MIN_SIZE = 1024 * 1024
+
+
+def split_entry_path(info: ZipInfo) -> list[str]:
+    """
+    Split a ZIP entry name into its folder/file components.
+
+    Raises:
+        HTTPException(400): If the entry escapes the archive root (e.g. `../x`).
+    """
+    parts = [part for part in info.filename.replace("\\", "/").split("/") if part not in ("", ".")]
+    if ".." in parts:
+        raise HTTPException(status_code=400, detail=f"Unsafe path in ZIP archive: {info.filename}")
+    return parts
+
+
+def check_zip_limits(infos: list[ZipInfo]) -> None:
+    """
+    Validate the archive's central directory against the configured zip-bomb limits
+    before any member is read.
+
+    The declared sizes are binding: `ZipFile.open` never yields more than an
+    entry's `file_size` and verifies its CRC, so a lying header fails the read.
+
+    Raises:
+        HTTPException(413): If the archive has too many entries, is too large
+            once uncompressed, or contains an entry compressed beyond the allowed ratio.
+    """
+    if len(infos) > settings.ZIP_MAX_ENTRIES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"ZIP archive has {len(infos)} entries; the limit is {settings.ZIP_MAX_ENTRIES}"
+        )
+
+    total_size = 0
+    for info in infos:
+        total_size += info.file_size
+        if total_size > settings.ZIP_MAX_TOTAL_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"ZIP archive expands beyond {settings.ZIP_MAX_TOTAL_SIZE} bytes"
+            )
+        if (
+            info.file_size >= RATIO_CHECK_MIN_SIZE
+            and info.file_size > info.compress_size * settings.ZIP_MAX_COMPRESSION_RATIO
+        ):
+            raise HTTPException(
+                status_code=413,
+                detail=f"ZIP entry {info.filename} exceeds the compression ratio limit"
+            )
+
+
+def create_folder_tree(
+    db: Session,
+    paths: set[tuple[str, ...]],
+    root_name: str,
+    parent_folder: Optional[models.Folder],
+    owner_id: int
+) -> dict[tuple[str, ...], int]:
+    """
+    Bulk-insert a root folder and every folder path below it, one
+    `INSERT ... RETURNING id` per tree level, then fill in their materialized
+    paths with one bulk UPDATE. Nothing is committed.
+
+    Args:
+        paths (set): Folder paths relative to the root; every ancestor must be present too.
+
+    Returns:
+        dict: Folder ID for each path, with `()` mapping to the root folder.
+    """
+    now = datetime.utcnow()
+    folder_ids: dict[tuple[str, ...], int] = {}
+    levels: dict[int, list[tuple[str, ...]]] = {}
+    for path in paths:
+        levels.setdefault(len(path), []).append(path)
+    levels[0] = [()]
+
+    for depth in sorted(levels):
+        level = levels[depth]
+        rows = [
+            {
+                "name": path[-1] if path else root_name,
+                "owner_id": owner_id,
+                "parent_id": folder_ids[path[:-1]] if path else (parent_folder.id if parent_folder else None),
+                "created_at": now
+            }
+            for path in level
+        ]
+        ids = db.execute(
+            insert(models.Folder).returning(models.Folder.id, sort_by_parameter_order=True),
+            rows
+        ).scalars().all()
+        folder_ids.update(zip(level, ids))
+
+    # Paths need the generated IDs, and parents come before their children
+    folder_paths: dict[tuple[str, ...], str] = {}
+    for path in sorted(folder_ids, key=len):
+        parent_path = folder_paths[path[:-1]] if path else (parent_folder.path if parent_folder else None)
+        folder_paths[path] = folder_path(parent_path, folder_ids[path])
+    db.execute(
+        update(models.Folder),
+        [{"id": folder_ids[path], "path": folder_paths[path]} for path in folder_ids]
+    )
+
+    return folder_ids
+
+
+def ingest_zip(
+    db: Session,
+    zip_data,
+    root_name: str,
+    parent_folder: Optional[models.Folder],
+    owner_id: int,
+    progress=None,
+    before_commit: Optional[Callable[[int], None]] = None
+) -> models.Folder:
+    """
+    Recreate the contents of a ZIP archive as folders and files.
+
+    Members are read straight from the (spooled) upload through the central
+    directory and streamed into MinIO by a bounded pool of `UPLOAD_CONCURRENCY`
+    threads; nothing is extracted to the filesystem. The folder tree and file
+    rows are built in memory and written with bulk inserts in a single short
+    transaction once every member is stored. If any member fails, the objects
+    of the blobs the archive introduced are removed and nothing is committed.
+
+    Args:
+        db (Session): SQLAlchemy session.
+        zip_data: Seekable file-like object holding the archive (e.g. UploadFile.file).
+        root_name (str): Name of the folder created to hold the archive contents.
+        parent_folder (Optional[Folder]): Folder to create the root folder in, or None for the root level.
+        owner_id (int): ID of the user owning the new folders and files.
+        progress: Optional reporter with `start(files_total, bytes_total)` and
+            `advance(size)` methods; `advance` is called from worker threads.
+        before_commit (Optional[Callable]): Called with the root folder's ID
+            right before the commit, to record more changes in the same
+            transaction; raising from it rolls the ingest back.
+
+    Returns:
+        Folder: The root folder created for the archive.
+
+    Raises:
+        HTTPException(400): If the upload is not a valid ZIP archive.
+        HTTPException(413): If the archive exceeds the configured limits.
+    """
+    try:
+        zip_ref = ZipFile(zip_data, "r")
+    except BadZipFile:
+        raise HTTPException(status_code=400, detail="Uploaded file is not a valid ZIP archive.")
+
+    with zip_ref:
+        infos = zip_ref.infolist()
+        check_zip_limits(infos)
+
+        # Collect the folder paths (including implicit parents) and file entries
+        folder_paths: set[tuple[str, ...]] = set()
+        file_entries: list[tuple[ZipInfo, tuple[str, ...]]] = []
+        for info in infos:
+            parts = tuple(split_entry_path(info))
+            if not parts:
+                continue
+            if info.is_dir():
+                folder_parts = parts
+            else:
+                folder_parts = parts[:-1]
+                file_entries.append((info, parts))
+            for depth in range(1, len(folder_parts) + 1):
+                folder_paths.add(folder_parts[:depth])
+
+        if progress:
+            progress.start(len(file_entries), sum(info.file_size for info, _ in file_entries))
+
+        # Push the members to MinIO in parallel; ZipFile.open is serialized,
+        # reads of open members are already synchronized by ZipFile itself
+        open_lock = threading.Lock()
+
+        def member_source(info: ZipInfo):
+            def open_member():
+                with open_lock:
+                    return zip_ref.open(info)
+            return open_member
+
+        results, written = store_objects(
+            db,
+            [member_source(info) for info, _ in file_entries],
+            settings.UPLOAD_CONCURRENCY,
+            on_stored=(lambda index: progress.advance(file_entries[index][0].file_size)) if progress else None
+        )
+
+        try:
+            # Rows are only written once every member is in MinIO, so the
+            # transaction holds no locks while the archive is being uploaded
+            folder_ids = create_folder_tree(db, folder_paths, root_name, parent_folder, owner_id)
+            now = datetime.utcnow()
+            file_rows = []
+            for (info, parts), result in zip(file_entries, results):
+                if isinstance(result, Exception):
+                    raise HTTPException(
+                        status_code=500,
+                        detail=f"Failed to store ZIP entry {info.filename}: {result}"
+                    )
+                file_rows.append({
+                    "id": str(uuid.uuid4()),
+                    "filename": parts[-1],
+                    "mime_type": mimetypes.guess_type(parts[-1])[0] or "application/octet-stream",
+                    "size": result.size,
+                    "owner_id": owner_id,
+                    "folder_id": folder_ids[parts[:-1]],
+                    "blob_sha256": result.sha256,
+                    "etag": result.sha256,
+                    "upload_time": now
+                })
+
+            if file_rows:
+                db.execute(insert(models.File), file_rows)
+
+            # The new tree's counters come from its rows; the parent gains one subfolder
+            recompute_folder_counters(db, [folder_ids[()]])
+            if parent_folder:
+                adjust_folder_counters(
+                    db, parent_folder.id, subfolders=1,
+                    total_files=len(file_rows), total_size=sum(row["size"] for row in file_rows)
+                )
+            if before_commit:
+                before_commit(folder_ids[()])
+            db.commit()
+        except Exception:
+            # Remove the objects this archive added while their blob rows are still locked
+            discard_objects(written)
+            db.rollback()
+            raise
+
+    return db.get(models.Folder, folder_ids[()])
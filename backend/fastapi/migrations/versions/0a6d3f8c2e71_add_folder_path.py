@@ -0,0 +1,46 @@
+"""add folder path
+
+Revision ID: 0a6d3f8c2e71
+Revises: f41c6b9e2d57
+Create Date: 2026-10-18 17:24:51.603829
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6d3f8c2e71'
+down_revision: Union[str, Sequence[str], None] = 'f41c6b9e2d57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('folders', sa.Column('path', sa.String(), server_default='', nullable=False))
+
+    # Backfill every tree from its top-level folder down
+    op.execute("""
+        WITH RECURSIVE tree (id, path) AS (
+            SELECT id, CAST(id AS TEXT) || '/' FROM folders WHERE parent_id IS NULL
+            UNION ALL
+            SELECT folders.id, tree.path || CAST(folders.id AS TEXT) || '/'
+            FROM folders JOIN tree ON folders.parent_id = tree.id
+        )
+        UPDATE folders SET path = tree.path
+        FROM tree
+        WHERE folders.id = tree.id
+    """)
+    op.create_index(
+        'ix_folders_path', 'folders', ['path'], unique=False,
+        postgresql_ops={'path': 'text_pattern_ops'}
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_folders_path', table_name='folders')
+    op.drop_column('folders', 'path')
@@ -0,0 +1,30 @@
+"""add tree listing indexes
+
+Revision ID: 1b7e4a9d3c85
+Revises: 0a6d3f8c2e71
+Create Date: 2026-10-18 18:05:12.734960
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b7e4a9d3c85'
+down_revision: Union[str, Sequence[str], None] = '0a6d3f8c2e71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_folders_owner_id'), 'folders', ['owner_id'], unique=False)
+    op.create_index(op.f('ix_files_folder_id'), 'files', ['folder_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_files_folder_id'), table_name='files')
+    op.drop_index(op.f('ix_folders_owner_id'), table_name='folders')
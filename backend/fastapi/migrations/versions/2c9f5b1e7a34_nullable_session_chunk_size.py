@@ -0,0 +1,35 @@
+"""nullable session chunk size
+
+Revision ID: 2c9f5b1e7a34
+Revises: 1b7e4a9d3c85
+Create Date: 2026-10-19 09:41:27.318652
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c9f5b1e7a34'
+down_revision: Union[str, Sequence[str], None] = '1b7e4a9d3c85'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('upload_sessions', 'chunk_size',
+               existing_type=sa.Integer(),
+               nullable=True)
+    # Single-PUT sessions have no chunks; they used to store the file size here
+    op.execute("UPDATE upload_sessions SET chunk_size = NULL WHERE upload_id IS NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM upload_sessions WHERE chunk_size IS NULL")
+    op.alter_column('upload_sessions', 'chunk_size',
+               existing_type=sa.Integer(),
+               nullable=False)
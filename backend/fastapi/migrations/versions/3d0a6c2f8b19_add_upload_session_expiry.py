@@ -0,0 +1,33 @@
+"""add upload session expiry
+
+Revision ID: 3d0a6c2f8b19
+Revises: 2c9f5b1e7a34
+Create Date: 2026-10-19 11:12:40.528913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d0a6c2f8b19'
+down_revision: Union[str, Sequence[str], None] = '2c9f5b1e7a34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('upload_sessions', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    # Existing sessions get the default lifetime from their creation
+    op.execute("UPDATE upload_sessions SET expires_at = created_at + INTERVAL '1 day'")
+    op.alter_column('upload_sessions', 'expires_at', existing_type=sa.DateTime(), nullable=False)
+    op.create_index(op.f('ix_upload_sessions_expires_at'), 'upload_sessions', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_upload_sessions_expires_at'), table_name='upload_sessions')
+    op.drop_column('upload_sessions', 'expires_at')
@@ -0,0 +1,40 @@
+"""add content-addressed blobs
+
+Revision ID: b7d31e5a0c42
+Revises: 8a4e2d6c9f13
+Create Date: 2026-10-18 11:20:13.904377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d31e5a0c42'
+down_revision: Union[str, Sequence[str], None] = '8a4e2d6c9f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    op.add_column('files', sa.Column('blob_sha256', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_files_blob_sha256'), 'files', ['blob_sha256'], unique=False)
+    op.create_foreign_key('files_blob_sha256_fkey', 'files', 'blobs', ['blob_sha256'], ['sha256'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('files_blob_sha256_fkey', 'files', type_='foreignkey')
+    op.drop_index(op.f('ix_files_blob_sha256'), table_name='files')
+    op.drop_column('files', 'blob_sha256')
+    op.drop_table('blobs')
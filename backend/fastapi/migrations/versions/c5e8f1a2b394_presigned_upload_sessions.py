@@ -0,0 +1,33 @@
+"""allow presigned single-PUT upload sessions
+
+Revision ID: c5e8f1a2b394
+Revises: b7d31e5a0c42
+Create Date: 2026-10-18 12:41:55.207610
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e8f1a2b394'
+down_revision: Union[str, Sequence[str], None] = 'b7d31e5a0c42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('upload_sessions', 'upload_id',
+               existing_type=sa.String(),
+               nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM upload_sessions WHERE upload_id IS NULL")
+    op.alter_column('upload_sessions', 'upload_id',
+               existing_type=sa.String(),
+               nullable=False)
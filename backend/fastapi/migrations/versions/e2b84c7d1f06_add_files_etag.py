@@ -0,0 +1,31 @@
+"""add files etag
+
+Revision ID: e2b84c7d1f06
+Revises: d9a07c3e5f28
+Create Date: 2026-10-18 15:12:08.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b84c7d1f06'
+down_revision: Union[str, Sequence[str], None] = 'd9a07c3e5f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('files', sa.Column('etag', sa.String(length=128), nullable=True))
+    # Deduplicated files are validated by their content hash; the others are
+    # filled in from MinIO the first time they are downloaded
+    op.execute("UPDATE files SET etag = blob_sha256 WHERE blob_sha256 IS NOT NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('files', 'etag')
@@ -0,0 +1,58 @@
+"""add folder counters
+
+Revision ID: f41c6b9e2d57
+Revises: e2b84c7d1f06
+Create Date: 2026-10-18 16:02:44.190317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f41c6b9e2d57'
+down_revision: Union[str, Sequence[str], None] = 'e2b84c7d1f06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('folders', sa.Column('file_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('folders', sa.Column('subfolder_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('folders', sa.Column('total_file_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('folders', sa.Column('total_size', sa.BigInteger(), server_default='0', nullable=False))
+
+    # Backfill from the existing rows
+    op.execute("""
+        UPDATE folders SET
+            file_count = (SELECT count(*) FROM files WHERE files.folder_id = folders.id),
+            subfolder_count = (SELECT count(*) FROM folders AS child WHERE child.parent_id = folders.id)
+    """)
+    op.execute("""
+        WITH RECURSIVE closure (ancestor_id, folder_id) AS (
+            SELECT id, id FROM folders
+            UNION ALL
+            SELECT closure.ancestor_id, folders.id
+            FROM folders JOIN closure ON folders.parent_id = closure.folder_id
+        )
+        UPDATE folders SET
+            total_file_count = totals.files,
+            total_size = totals.size
+        FROM (
+            SELECT closure.ancestor_id, count(files.id) AS files, coalesce(sum(files.size), 0) AS size
+            FROM closure LEFT JOIN files ON files.folder_id = closure.folder_id
+            GROUP BY closure.ancestor_id
+        ) AS totals
+        WHERE folders.id = totals.ancestor_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('folders', 'total_size')
+    op.drop_column('folders', 'total_file_count')
+    op.drop_column('folders', 'subfolder_count')
+    op.drop_column('folders', 'file_count')
@@ -0,0 +1,87 @@
+import uuid
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def api():
+    """
+    The FastAPI application. Importing it creates the schema and the bucket,
+    so the Postgres and MinIO services from docker-compose must be running.
+    """
+    try:
+        from app.main import app
+    except Exception as e:
+        pytest.skip(f"Postgres and MinIO are not reachable: {e}")
+    return app
+
+
+@pytest.fixture
+def db(api):
+    from app.db.database import SessionLocal
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def user_id(db):
+    """
+    A fresh user, removed with everything it owns after the test.
+    """
+    from app.db import models
+    user = models.User(username=f"test-{uuid.uuid4()}", hashed_password="unused")
+    db.add(user)
+    db.commit()
+    yield user.id
+
+
+@pytest.fixture
+def client(api, db, user_id):
+    """
+    A test client authenticated as `user_id`.
+    """
+    from app.auth.jwt import get_current_user_id
+    from app.db import models
+
+    api.dependency_overrides[get_current_user_id] = lambda: user_id
+    with TestClient(api) as test_client:
+        yield test_client
+
+        # Deleting through the API also releases blobs and removes objects
+        for folder in test_client.get("/folders").json():
+            test_client.delete(f"/folders/{folder['id']}")
+        for file in test_client.get("/myfiles").json():
+            test_client.delete(f"/myfiles/delete/{file['id']}")
+    api.dependency_overrides.pop(get_current_user_id, None)
+
+    db.query(models.Favorite).filter(models.Favorite.user_id == user_id).delete()
+    db.query(models.IngestJob).filter(models.IngestJob.owner_id == user_id).delete()
+    db.query(models.UploadSession).filter(models.UploadSession.owner_id == user_id).delete()
+    db.query(models.User).filter(models.User.id == user_id).delete()
+    db.commit()
+
+
+@pytest.fixture
+def count_selects(api):
+    """
+    Context manager collecting the SELECT statements sent to the database inside its block.
+    """
+    from app.db.database import engine
+
+    @contextmanager
+    def counter():
+        statements: list[str] = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+                statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    return counter
@@ -0,0 +1,26 @@
+import pytest
+
+
+def test_deleting_a_folder_discards_upload_sessions_inside_it(client, db):
+    from app.db import models
+    from app.storage import minio_client
+
+    outer = client.post("/folders", json={"name": "outer"}).json()
+    inner = client.post("/folders", json={"name": "inner", "parent_id": outer["id"]}).json()
+    response = client.post(
+        "/upload_sessions",
+        json={"filename": "big.bin", "size": 10 * 1024 * 1024, "folder_id": inner["id"]}
+    )
+    assert response.status_code == 200
+    session_id = response.json()["id"]
+    upload_session = db.get(models.UploadSession, session_id)
+    object_name, upload_id = upload_session.object_name, upload_session.upload_id
+    db.expunge(upload_session)
+    db.rollback()
+
+    assert client.delete(f"/folders/{outer['id']}").status_code == 200
+
+    assert db.get(models.UploadSession, session_id) is None
+    # The multipart upload was aborted rather than left to the expiry sweep
+    with pytest.raises(RuntimeError):
+        minio_client.list_parts(object_name, upload_id)
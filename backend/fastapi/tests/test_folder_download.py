@@ -0,0 +1,56 @@
+import io
+import uuid
+import zipfile
+
+
+def _upload_tree(client, top: str = "top") -> dict:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("top.txt", top)
+        archive.writestr("docs/guide.txt", "guide")
+        archive.writestr("docs/deep/notes.txt", "notes")
+    response = client.post(
+        "/upload_zip_file",
+        files={"zip_file": ("tree.zip", buffer.getvalue(), "application/zip")}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_selection_with_nested_folder_writes_each_file_once(client):
+    root = _upload_tree(client)
+    docs = root["subfolders"][0]
+    top_file = root["files"][0]
+
+    response = client.post(
+        "/folders/download",
+        json={"folder_ids": [root["id"], docs["id"]], "file_ids": [top_file["id"]], "format": "zip"}
+    )
+
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert sorted(archive.namelist()) == [
+            "tree/docs/deep/notes.txt",
+            "tree/docs/guide.txt",
+            "tree/top.txt"
+        ]
+
+
+def test_archive_reads_do_not_fill_the_object_cache(client):
+    from app.storage.object_cache import object_cache
+
+    def cached_entries():
+        stats = object_cache.stats()
+        return stats["memory_entries"] + stats["disk_entries"]
+
+    # Unique contents, so no other test has cached the same blob
+    root = _upload_tree(client, top=str(uuid.uuid4()))
+    before = cached_entries()
+
+    response = client.get(f"/folders/download/{root['id']}", params={"format": "zip"})
+    assert response.status_code == 200
+    assert cached_entries() == before
+
+    # A plain download of the same file is still admitted
+    assert client.get(f"/myfiles/download/{root['files'][0]['id']}").status_code == 200
+    assert cached_entries() == before + 1
@@ -0,0 +1,39 @@
+def _folder_with_subfolders(client, count: int) -> int:
+    parent = client.post("/folders", json={"name": f"parent-{count}"}).json()
+    for index in range(count):
+        child = client.post("/folders", json={"name": f"child-{index}", "parent_id": parent["id"]}).json()
+        client.post("/folders", json={"name": "grandchild", "parent_id": child["id"]})
+        client.post("/favorites", json={"folder_id": child["id"]})
+    return parent["id"]
+
+
+def _selects(client, count_selects, path: str) -> int:
+    with count_selects() as statements:
+        response = client.get(path)
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_folder_details_queries_do_not_grow_with_subfolders(client, count_selects):
+    small = _folder_with_subfolders(client, 2)
+    large = _folder_with_subfolders(client, 25)
+
+    few = _selects(client, count_selects, f"/folders/{small}/details")
+    assert _selects(client, count_selects, f"/folders/{large}/details") == few
+
+
+def test_top_level_listing_queries_do_not_grow_with_folders(client, count_selects):
+    _folder_with_subfolders(client, 1)
+    few = _selects(client, count_selects, "/folders")
+    for _ in range(25):
+        _folder_with_subfolders(client, 1)
+
+    assert _selects(client, count_selects, "/folders") == few
+
+
+def test_favorites_queries_do_not_grow_with_favorites(client, count_selects):
+    _folder_with_subfolders(client, 2)
+    few = _selects(client, count_selects, "/favorites")
+    _folder_with_subfolders(client, 25)
+
+    assert _selects(client, count_selects, "/favorites") == few
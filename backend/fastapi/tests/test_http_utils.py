@@ -0,0 +1,25 @@
+import pytest
+from fastapi import HTTPException
+from app.utils.http_utils import parse_range_header
+
+
+def test_explicit_open_ended_and_suffix_ranges():
+    assert parse_range_header("bytes=0-499", 5000) == [(0, 499)]
+    assert parse_range_header("bytes=4500-", 5000) == [(4500, 4999)]
+    assert parse_range_header("bytes=-500", 5000) == [(4500, 4999)]
+    assert parse_range_header("bytes=4900-99999", 5000) == [(4900, 4999)]
+
+
+def test_malformed_or_foreign_ranges_are_ignored():
+    assert parse_range_header("bytes=500-100", 5000) is None
+    assert parse_range_header("items=0-1", 5000) is None
+    assert parse_range_header("bytes=abc-", 5000) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=99999-", "bytes=5000-", "bytes=99999-100000"])
+def test_ranges_past_the_end_are_unsatisfiable(header):
+    # Resuming an already complete download must not send the whole file again
+    with pytest.raises(HTTPException) as excinfo:
+        parse_range_header(header, 5000)
+    assert excinfo.value.status_code == 416
+    assert excinfo.value.headers["Content-Range"] == "bytes */5000"
@@ -0,0 +1,93 @@
+import io
+import uuid
+import zipfile
+import pytest
+
+
+class _Crash(BaseException):
+    """
+    Stands in for the process dying: not caught by the job's error handling.
+    """
+
+
+def _stage_job(db, user_id: int, filename: str):
+    from app.db import models
+    from app.jobs import ingest
+    from app.storage import minio_client
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("a.txt", "a")
+        archive.writestr("sub/b.txt", "b")
+    buffer.seek(0)
+
+    job_id = str(uuid.uuid4())
+    archive_object = ingest.ARCHIVE_PREFIX + job_id + ".zip"
+    minio_client.upload_file(buffer, archive_object)
+    db.add(models.IngestJob(
+        id=job_id, owner_id=user_id, filename=filename, archive_object=archive_object, status="queued"
+    ))
+    db.commit()
+    return job_id
+
+
+def test_crash_after_ingest_commit_does_not_ingest_twice(client, db, user_id, monkeypatch):
+    from app.db import models
+    from app.jobs import ingest
+
+    job_id = _stage_job(db, user_id, "crash.zip")
+
+    def crash(archive_object):
+        raise _Crash()
+
+    monkeypatch.setattr(ingest, "_remove_archive", crash)
+    monkeypatch.setattr(ingest, "submit", lambda job_id: None)
+    with pytest.raises(_Crash):
+        ingest.run_job(job_id)
+    monkeypatch.undo()
+
+    db.expire_all()
+    job = db.get(models.IngestJob, job_id)
+    assert job.status == "completed"
+    assert job.root_folder_id is not None
+
+    # A later process sweeping with every running job considered stale, then running the job again
+    monkeypatch.setattr(ingest.settings, "INGEST_STALE_SECONDS", 0)
+    monkeypatch.setattr(ingest, "submit", lambda job_id: None)
+    ingest.recover_jobs(startup=True)
+    ingest.run_job(job_id)
+
+    roots = db.query(models.Folder).filter(
+        models.Folder.owner_id == user_id,
+        models.Folder.name == "crash"
+    ).all()
+    assert [folder.id for folder in roots] == [job.root_folder_id]
+    ingest._remove_archive(job.archive_object)
+
+
+def test_superseded_worker_rolls_its_ingest_back(client, db, user_id, monkeypatch):
+    from app.db import models
+    from app.jobs import ingest
+    from sqlalchemy import update
+
+    job_id = _stage_job(db, user_id, "superseded.zip")
+    ingest_zip = ingest.ingest_zip
+
+    def ingest_then_lose_the_job(*args, **kwargs):
+        # The reaper requeues the job and another worker claims it while this one runs
+        db.execute(update(models.IngestJob).where(models.IngestJob.id == job_id).values(status="queued"))
+        db.commit()
+        assert ingest._claim_job(job_id) == 2
+        return ingest_zip(*args, **kwargs)
+
+    monkeypatch.setattr(ingest, "ingest_zip", ingest_then_lose_the_job)
+    ingest.run_job(job_id)
+
+    db.expire_all()
+    job = db.get(models.IngestJob, job_id)
+    assert job.status == "running"
+    assert db.query(models.Folder).filter(
+        models.Folder.owner_id == user_id,
+        models.Folder.name == "superseded"
+    ).count() == 0
+    ingest._remove_archive(job.archive_object)
@@ -0,0 +1,34 @@
+import io
+import time
+import uuid
+import hashlib
+import zipfile
+
+
+def test_sweep_removes_only_unreferenced_blob_objects(client):
+    from app.db import models
+    from app.storage import minio_client
+    from app.jobs.orphan_blobs import sweep_orphan_blobs
+
+    # What an upload interrupted between writing the object and taking its reference leaves behind
+    orphan = uuid.uuid4().bytes
+    orphan_name = models.BLOB_PREFIX + hashlib.sha256(orphan).hexdigest()
+    minio_client.upload_file(io.BytesIO(orphan), orphan_name)
+
+    kept = str(uuid.uuid4()).encode()
+    kept_name = models.BLOB_PREFIX + hashlib.sha256(kept).hexdigest()
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("kept.txt", kept)
+    response = client.post(
+        "/upload_zip_file",
+        files={"zip_file": ("kept.zip", buffer.getvalue(), "application/zip")}
+    )
+    assert response.status_code == 200
+
+    # Object timestamps have a one-second resolution
+    time.sleep(1)
+    assert sweep_orphan_blobs(grace_seconds=0) >= 1
+
+    assert minio_client.stat_file(orphan_name) is None
+    assert minio_client.stat_file(kept_name) is not None
@@ -0,0 +1,84 @@
+import io
+import time
+import asyncio
+import zipfile
+import httpx
+
+
+def _zip_bytes() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("readme.txt", "hello")
+        archive.writestr("docs/guide.txt", "a" * 1000)
+        archive.writestr("docs/empty/", "")
+    return buffer.getvalue()
+
+
+def test_upload_zip_file_recreates_the_archive_tree(client):
+    response = client.post(
+        "/upload_zip_file",
+        files={"zip_file": ("project.zip", _zip_bytes(), "application/zip")}
+    )
+
+    assert response.status_code == 200
+    root = response.json()
+    assert root["name"] == "project"
+    assert [f["filename"] for f in root["files"]] == ["readme.txt"]
+    assert [sf["name"] for sf in root["subfolders"]] == ["docs"]
+    assert root["total_file_count"] == 2
+    assert root["total_size"] == 1005
+
+    docs = client.get(f"/folders/{root['subfolders'][0]['id']}/details").json()
+    assert [f["filename"] for f in docs["files"]] == ["guide.txt"]
+    assert [sf["name"] for sf in docs["subfolders"]] == ["empty"]
+
+
+def test_requests_stay_fast_during_concurrent_slow_zip_ingests(api, client, monkeypatch):
+    """
+    While several slow ingests run at once, a steady stream of concurrent
+    requests keeps a p99 latency far below the duration of one ingest.
+    """
+    from app.routes import upload
+
+    ingests, requests, ingest_seconds = 4, 60, 2.0
+    ingest_zip = upload.ingest_zip
+
+    def slow_ingest_zip(*args, **kwargs):
+        time.sleep(ingest_seconds)
+        return ingest_zip(*args, **kwargs)
+
+    monkeypatch.setattr(upload, "ingest_zip", slow_ingest_zip)
+
+    async def timed_health(async_client) -> float:
+        started = time.monotonic()
+        response = await async_client.get("/health")
+        assert response.status_code == 200
+        return time.monotonic() - started
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=api)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as async_client:
+            uploads = [
+                asyncio.create_task(async_client.post(
+                    "/upload_zip_file",
+                    files={"zip_file": (f"slow-{n}.zip", _zip_bytes(), "application/zip")}
+                ))
+                for n in range(ingests)
+            ]
+            await asyncio.sleep(0.3)
+
+            # Spread the requests over most of the ingests' duration, several in flight at a time
+            probes = []
+            for _ in range(requests):
+                probes.append(asyncio.create_task(timed_health(async_client)))
+                await asyncio.sleep(ingest_seconds / 2 / requests)
+            latencies = await asyncio.gather(*probes)
+
+            assert not any(task.done() for task in uploads)
+            return sorted(latencies), await asyncio.gather(*uploads)
+
+    latencies, responses = asyncio.run(scenario())
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    assert p99 < 0.25, f"p99 {p99:.3f}s"
+    assert [r.status_code for r in responses] == [200] * ingests
+    assert sorted(r.json()["name"] for r in responses) == [f"slow-{n}" for n in range(ingests)]